@@ -0,0 +1,45 @@
+"""让基准测试脱离 AstrBot 运行
+
+未安装 AstrBot 时注入 astrbot.api.logger 桩，并把插件目录作为包加载，
+插件内的相对导入因此可以正常工作。
+"""
+
+import importlib.machinery
+import importlib.util
+import logging
+import sys
+import types
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+PACKAGE_NAME = "joinmanager_bench"
+
+
+def install_astrbot_stub():
+    try:
+        import astrbot.api  # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    astrbot_module = types.ModuleType("astrbot")
+    api_module = types.ModuleType("astrbot.api")
+    api_module.logger = logging.getLogger("joinmanager.bench")  # type: ignore[attr-defined]
+    astrbot_module.api = api_module  # type: ignore[attr-defined]
+    sys.modules["astrbot"] = astrbot_module
+    sys.modules["astrbot.api"] = api_module
+
+
+def load_plugin_package() -> str:
+    """以包的形式注册插件目录，返回包名"""
+    install_astrbot_stub()
+    if PACKAGE_NAME not in sys.modules:
+        spec = importlib.machinery.ModuleSpec(PACKAGE_NAME, None, is_package=True)
+        spec.submodule_search_locations = [str(PLUGIN_DIR)]
+        sys.modules[PACKAGE_NAME] = importlib.util.module_from_spec(spec)
+    return PACKAGE_NAME
+
+
+def import_plugin_module(name: str) -> types.ModuleType:
+    package = load_plugin_package()
+    return importlib.import_module(f"{package}.{name}")
@@ -0,0 +1,78 @@
+"""基准测试共用的模拟数据"""
+
+import random
+import string
+
+from _bootstrap import import_plugin_module
+
+records_module = import_plugin_module("records")
+
+CATEGORIES = ["B站", "抖音", "GitHub", "小红书", "朋友推荐", "人工审核"]
+KEYWORDS = ["up", "哔", "抖", "gh", "github", "小红书", "推荐"]
+BASE_TIME = 1_700_000_000
+
+
+def category_names(count: int) -> list[str]:
+    """前几个为常见分类，不够时补充编号分类"""
+    names = CATEGORIES[:count]
+    names += [f"分类{index}" for index in range(len(names), count)]
+    return names
+
+
+def build_records(
+    total: int, groups: int = 50, categories: list[str] | None = None
+) -> dict:
+    """生成 total 条入群记录，平均分布在 groups 个群中"""
+    categories = categories or CATEGORIES
+    rng = random.Random(total)
+    records: dict = {}
+    for index in range(total):
+        group_id = str(600_000_000 + index % groups)
+        group_records = records.setdefault(group_id, records_module.GroupRecords())
+        category = rng.choice(categories)
+        group_records.set(
+            str(1_000_000_000 + index),
+            {
+                "accept_time": records_module.format_time(
+                    BASE_TIME + rng.randint(0, 86400 * 365)
+                ),
+                "accept_reason": "人工审核"
+                if category == "人工审核"
+                else f"匹配关键词: {rng.choice(KEYWORDS)}",
+                "category": category,
+            },
+        )
+    return records
+
+
+def build_keyword_rules(
+    keyword_count: int, categories: int = 10
+) -> tuple[list[str], dict[str, list[str]]]:
+    """生成 (拒绝词, {分类: 同意关键词})，两者各 keyword_count 个关键词"""
+    rng = random.Random(keyword_count)
+
+    def keyword() -> str:
+        return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+
+    reject_keywords = [keyword() for _ in range(keyword_count)]
+    accept_rules: dict[str, list[str]] = {}
+    for index in range(keyword_count):
+        category = category_names(categories)[index % categories]
+        accept_rules.setdefault(category, []).append(keyword())
+    return reject_keywords, accept_rules
+
+
+def build_comments(count: int, keywords: list[str], hit_ratio: float = 0.3):
+    """生成验证消息，其中约 hit_ratio 的消息包含一个关键词"""
+    rng = random.Random(count)
+    comments = []
+    for _ in range(count):
+        words = [
+            "".join(rng.choices(string.ascii_lowercase + " ", k=rng.randint(8, 40)))
+        ]
+        if keywords and rng.random() < hit_ratio:
+            words.append(rng.choice(keywords))
+        words.append("我是从群主的视频过来的")
+        rng.shuffle(words)
+        comments.append(" ".join(words))
+    return comments
@@ -0,0 +1,110 @@
+"""对比统计图各输出格式、质量与 DPI 的编码耗时和图片大小
+
+用法: python benchmarks/bench_chart_output.py [--engine fast|matplotlib] [--repeat 5]
+"""
+
+import argparse
+import json
+import time
+from io import BytesIO
+
+from _bootstrap import PLUGIN_DIR, import_plugin_module
+from PIL import Image
+
+chart_output = import_plugin_module("chart_output")
+chart_style = import_plugin_module("chart_style")
+render = import_plugin_module("render")
+
+SUMMARY = {
+    "category_counts": {
+        "B站": 120,
+        "抖音": 80,
+        "GitHub": 45,
+        "小红书": 30,
+        "朋友推荐": 12,
+        "人工审核": 6,
+    },
+    "first_time": "2026-01-01 08:00:00",
+    "last_time": "2026-10-16 21:30:00",
+}
+
+OUTPUTS = [
+    chart_style.ChartOutput("png"),
+    chart_style.ChartOutput("webp", 90),
+    chart_style.ChartOutput("webp", 80),
+    chart_style.ChartOutput("jpeg", 90),
+    chart_style.ChartOutput("jpeg", 80),
+    chart_style.ChartOutput("png", dpi=80),
+    chart_style.ChartOutput("webp", 80, dpi=80),
+    chart_style.ChartOutput("jpeg", 80, dpi=80),
+]
+
+
+def render_source(engine: str, bg_img_name: str) -> Image.Image:
+    """按原尺寸绘制一张 PNG 统计图并解码，作为各输出选项的输入"""
+    module = render.get_engine_module(engine)
+    data = module.render_chart_bytes(
+        "123456789", SUMMARY, PLUGIN_DIR / "assets", "cute_font.ttf", bg_img_name
+    )
+    if data is None:
+        raise SystemExit("绘图失败")
+    with Image.open(BytesIO(data)) as image:
+        return image.convert("RGB")
+
+
+def measure(image: Image.Image, output, repeat: int) -> dict:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        buffer = BytesIO()
+        start = time.perf_counter()
+        chart_output.encode_chart(image, buffer, output)
+        best = min(best, time.perf_counter() - start)
+        size = buffer.tell()
+    width, height = output.size
+    return {
+        "format": output.format,
+        "quality": output.quality if output.format != "png" else None,
+        "dpi": output.dpi,
+        "pixels": f"{width}x{height}",
+        "encode_ms": round(best * 1000, 1),
+        "size_bytes": size,
+    }
+
+
+def run(args) -> list[dict]:
+    image = render_source(args.engine, args.bg)
+    return [measure(image, output, args.repeat) for output in OUTPUTS]
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--engine", default="fast", choices=list(render.CHART_ENGINES))
+    parser.add_argument("--bg", default="bg.jpg", help="assets 目录下的背景图")
+    parser.add_argument("--repeat", type=int, default=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(
+        f"{'format':>6} {'quality':>7} {'dpi':>4} {'pixels':>10}"
+        f" {'encode_ms':>10} {'size_kb':>9}"
+    )
+    for result in results:
+        quality = result["quality"] if result["quality"] is not None else "-"
+        print(
+            f"{result['format']:>6} {quality:>7} {result['dpi']:>4}"
+            f" {result['pixels']:>10} {result['encode_ms']:>10}"
+            f" {result['size_bytes'] / 1024:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""测量不同群人数与分类数下生成统计图的耗时
+
+summary_ms 为由群记录得到统计摘要的耗时，first_ms 为该群第一次绘图
+(含静态图层) 的耗时，draw_ms 为之后多次绘图中的最短耗时 (含图片编码)。
+按多种输出格式测量可以区分绘制与编码的耗时：jpeg 的编码只需几毫秒，
+与 png 的差值基本就是 PNG 编码本身的耗时。
+
+用法: python benchmarks/bench_draw_chart.py [--engines fast matplotlib]
+      [--members 10 1000 100000] [--categories 1 8 50] [--formats png jpeg]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from _bootstrap import PLUGIN_DIR, import_plugin_module
+from _fixtures import build_records, category_names
+
+render = import_plugin_module("render")
+chart_style = import_plugin_module("chart_style")
+
+ASSETS_DIR = PLUGIN_DIR / "assets"
+
+
+def load_engine(engine: str):
+    """绘图引擎的依赖未安装时返回 None，跳过该引擎"""
+    try:
+        return render.get_engine_module(engine)
+    except ImportError as e:
+        print(f"跳过绘图引擎 {engine}: {e}", file=sys.stderr)
+        return None
+
+
+def measure(module, members: int, categories: int, image_format: str, args) -> dict:
+    records = build_records(members, groups=1, categories=category_names(categories))
+    group_id, group_records = next(iter(records.items()))
+
+    start = time.perf_counter()
+    summary = group_records.stats.summary()
+    summary_seconds = time.perf_counter() - start
+
+    def draw() -> tuple[float, int]:
+        start = time.perf_counter()
+        data = module.render_chart_bytes(
+            group_id,
+            summary,
+            ASSETS_DIR,
+            args.font,
+            args.bg,
+            "基准测试群",
+            chart_style.ChartOutput(format=image_format),
+            args.top_n,
+        )
+        elapsed = time.perf_counter() - start
+        if data is None:
+            raise RuntimeError("绘图失败")
+        return elapsed, len(data)
+
+    # 清空静态图层缓存，才能测到首次绘图
+    static_layer_cache = getattr(module, "_render_static_layer", None)
+    if static_layer_cache is not None:
+        static_layer_cache.cache_clear()
+    first_seconds, size = draw()
+    best = min(draw()[0] for _ in range(args.repeat))
+    return {
+        "members": members,
+        "categories": len(summary["category_counts"]),
+        "format": image_format,
+        "summary_ms": round(summary_seconds * 1000, 2),
+        "first_ms": round(first_seconds * 1000, 1),
+        "draw_ms": round(best * 1000, 1),
+        "size_bytes": size,
+    }
+
+
+def run(args) -> list[dict]:
+    results = []
+    for engine in args.engines:
+        module = load_engine(engine)
+        if module is None:
+            continue
+        for members in args.members:
+            for categories in args.categories:
+                for image_format in args.formats:
+                    result = measure(module, members, categories, image_format, args)
+                    result["engine"] = engine
+                    results.append(result)
+    return results
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=list(render.CHART_ENGINES),
+        choices=list(render.CHART_ENGINES),
+    )
+    parser.add_argument("--members", type=int, nargs="+", default=[10, 1000, 100_000])
+    parser.add_argument("--categories", type=int, nargs="+", default=[1, 8, 50])
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=["png", "jpeg"],
+        choices=list(chart_style.CHART_FORMATS),
+    )
+    parser.add_argument("--top-n", type=int, default=0, help="统计图分类上限")
+    parser.add_argument("--font", default="cute_font.ttf")
+    parser.add_argument("--bg", default="bg.jpg", help="assets 目录下的背景图")
+    parser.add_argument("--repeat", type=int, default=3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(
+        f"{'engine':>10} {'members':>8} {'categories':>10} {'format':>6}"
+        f" {'summary_ms':>10}"
+        f" {'first_ms':>9} {'draw_ms':>8} {'size_kb':>8}"
+    )
+    for result in results:
+        print(
+            f"{result['engine']:>10} {result['members']:>8}"
+            f" {result['categories']:>10} {result['format']:>6}"
+            f" {result['summary_ms']:>10}"
+            f" {result['first_ms']:>9} {result['draw_ms']:>8}"
+            f" {result['size_bytes'] / 1024:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
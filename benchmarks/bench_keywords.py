@@ -0,0 +1,150 @@
+"""测量拒绝词与同意规则的关键词匹配吞吐量
+
+loop 为逐个关键词查找子串 (依次匹配拒绝词与同意规则)，compiled 为插件使用的
+KeywordMatcher，compile_ms 为编译规则的耗时；--normalize 时 compiled 额外对
+关键词与验证消息做归一化。
+
+用法: python benchmarks/bench_keywords.py [--keywords 10 100 1000]
+      [--comments 10000] [--engines loop compiled] [--normalize]
+"""
+
+import argparse
+import json
+import time
+
+from _bootstrap import import_plugin_module
+from _fixtures import build_comments, build_keyword_rules
+
+matching = import_plugin_module("matching")
+normalize = import_plugin_module("normalize")
+
+
+ENGINES = ["loop", "compiled"]
+
+
+def match_reject_keyword(keywords: list[str], comment_lower: str) -> str | None:
+    """逐个查找：返回验证消息中第一个命中的拒绝词，comment_lower 为已转小写的验证消息"""
+    for kw in keywords:
+        if kw.lower() in comment_lower:
+            return kw
+    return None
+
+
+def match_accept_rule(
+    rules: dict[str, list[str]], comment_lower: str
+) -> tuple[str, str] | None:
+    """逐个查找：按配置顺序返回第一个命中的 (分类, 关键词)"""
+    for category_name, keywords in rules.items():
+        for kw in keywords:
+            if kw.lower() in comment_lower:
+                return category_name, kw
+    return None
+
+
+def match_loop(reject_keywords, accept_rules, comments: list[str]) -> int:
+    matched = 0
+    for comment in comments:
+        if match_reject_keyword(reject_keywords, comment) is not None:
+            matched += 1
+        elif match_accept_rule(accept_rules, comment) is not None:
+            matched += 1
+    return matched
+
+
+def match_compiled(matcher, comments: list[str]) -> int:
+    matched = 0
+    for comment in comments:
+        result = matcher.match(comment)
+        if result.reject_keyword is not None or result.category is not None:
+            matched += 1
+    return matched
+
+
+def measure(
+    engine: str, keyword_count: int, comment_count: int, repeat: int, table=None
+) -> dict:
+    reject_keywords, accept_rules = build_keyword_rules(keyword_count)
+    all_keywords = reject_keywords + [
+        keyword for keywords in accept_rules.values() for keyword in keywords
+    ]
+    comments = [
+        comment.lower() for comment in build_comments(comment_count, all_keywords)
+    ]
+
+    compile_seconds = 0.0
+    if engine == "compiled":
+        start = time.perf_counter()
+        matcher = matching.KeywordMatcher(reject_keywords, accept_rules, table)
+        compile_seconds = time.perf_counter() - start
+
+        def run_once() -> int:
+            return match_compiled(matcher, comments)
+
+    else:
+
+        def run_once() -> int:
+            return match_loop(reject_keywords, accept_rules, comments)
+
+    best = float("inf")
+    matched = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        matched = run_once()
+        best = min(best, time.perf_counter() - start)
+    return {
+        "engine": engine,
+        "normalize": engine == "compiled" and table is not None,
+        "compile_ms": round(compile_seconds * 1000, 2),
+        "keywords": keyword_count,
+        "comments": comment_count,
+        "matched": matched,
+        "total_ms": round(best * 1000, 1),
+        "us_per_comment": round(best / comment_count * 1_000_000, 2),
+        "comments_per_second": round(comment_count / best),
+    }
+
+
+def run(args) -> list[dict]:
+    table = normalize.build_translation_table() if args.normalize else None
+    return [
+        measure(engine, keyword_count, args.comments, args.repeat, table)
+        for keyword_count in args.keywords
+        for engine in args.engines
+    ]
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--comments", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=ENGINES)
+    parser.add_argument(
+        "--normalize", action="store_true", help="compiled 引擎开启关键词归一化"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(
+        f"{'engine':>9} {'keywords':>9} {'comments':>9} {'matched':>8}"
+        f" {'compile_ms':>10} {'total_ms':>9} {'us/comment':>11} {'comments/s':>11}"
+    )
+    for result in results:
+        print(
+            f"{result['engine']:>9} {result['keywords']:>9} {result['comments']:>9}"
+            f" {result['matched']:>8} {result['compile_ms']:>10}"
+            f" {result['total_ms']:>9} {result['us_per_comment']:>11}"
+            f" {result['comments_per_second']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""对比 JSON 与二进制快照的保存耗时、加载耗时和文件大小
+
+用法: python benchmarks/bench_serializers.py [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from _bootstrap import import_plugin_module
+from _fixtures import build_records
+
+records_module = import_plugin_module("records")
+serializers = import_plugin_module("serializers")
+
+
+def measure(serializer, records: dict, path: Path) -> dict:
+    start = time.perf_counter()
+    data = serializer.dumps(records)
+    path.write_bytes(data)
+    save_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = serializers.loads_records(path.read_bytes())
+    # JSON 读出的是字典，插件加载时还要转换为紧凑表示，一并计入
+    loaded = {
+        group_id: records_module.as_group_records(group_records)
+        for group_id, group_records in loaded.items()
+    }
+    load_seconds = time.perf_counter() - start
+
+    assert sum(len(group) for group in loaded.values()) == sum(
+        len(group) for group in records.values()
+    )
+    return {
+        "format": serializer.name,
+        "save_ms": round(save_seconds * 1000, 1),
+        "load_ms": round(load_seconds * 1000, 1),
+        "size_bytes": len(data),
+    }
+
+
+def run(args) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            records = build_records(size)
+            for serializer in serializers.SERIALIZERS.values():
+                path = Path(tmp_dir) / f"records{serializer.suffix}"
+                result = measure(serializer, records, path)
+                result["records"] = size
+                results.append(result)
+    return results
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'records':>10} {'format':>8} {'save_ms':>10} {'load_ms':>10} {'size_kb':>10}")
+    for result in results:
+        print(
+            f"{result['records']:>10} {result['format']:>8} {result['save_ms']:>10}"
+            f" {result['load_ms']:>10} {result['size_bytes'] / 1024:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
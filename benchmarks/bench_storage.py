@@ -0,0 +1,143 @@
+"""测量各存储模式下记录的保存、加载与单条变更写入耗时
+
+save_ms 对应插件的 _save_records (写入全部记录)，load_ms 对应 _load_records
+(读取并转换为紧凑表示)，apply_ms 为一次入群变更的写入耗时。
+
+用法: python benchmarks/bench_storage.py [--sizes 1000 10000 100000]
+      [--modes json binary journal sharded sqlite]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from _bootstrap import import_plugin_module
+from _fixtures import BASE_TIME, build_records
+
+records_module = import_plugin_module("records")
+serializers = import_plugin_module("serializers")
+storage_module = import_plugin_module("storage")
+
+MODES = ["json", "binary", "journal", "sharded", "sqlite"]
+
+
+def create_storage(mode: str, data_dir: Path):
+    """与插件的 _create_storage 使用相同的文件布局"""
+    json_file = data_dir / "join_records.json"
+    if mode == "binary":
+        return storage_module.FileRecordStorage(
+            data_dir / "join_records.bin", serializers.get_serializer("binary")
+        )
+    if mode == "journal":
+        return storage_module.JournalRecordStorage(
+            json_file, data_dir / "join_records.journal", 1024 * 1024
+        )
+    if mode == "sharded":
+        return storage_module.ShardedRecordStorage(data_dir / "records", json_file)
+    if mode == "sqlite":
+        return storage_module.SqliteRecordStorage(
+            data_dir / "join_records.db", json_file
+        )
+    return storage_module.FileRecordStorage(json_file)
+
+
+def all_changes(records: dict) -> list:
+    return [
+        ("insert", group_id, user_id, group_records.get(user_id))
+        for group_id, group_records in records.items()
+        for user_id in group_records
+    ]
+
+
+def directory_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def measure(mode: str, records: dict, data_dir: Path) -> dict:
+    storage = create_storage(mode, data_dir)
+    # 与插件一致，启动时先加载一次 (会创建分片目录等)
+    storage.load()
+    start = time.perf_counter()
+    if mode == "sqlite":
+        # 数据库按行写入，全部记录以变更的形式落库
+        storage.apply(records, all_changes(records))
+    storage.save(records)
+    save_seconds = time.perf_counter() - start
+    storage.close()
+
+    storage = create_storage(mode, data_dir)
+    start = time.perf_counter()
+    loaded = {
+        str(group_id): records_module.as_group_records(group_records)
+        for group_id, group_records in storage.load().items()
+    }
+    load_seconds = time.perf_counter() - start
+    assert sum(len(group) for group in loaded.values()) == sum(
+        len(group) for group in records.values()
+    )
+
+    group_id = next(iter(loaded))
+    record = {
+        "accept_time": records_module.format_time(BASE_TIME),
+        "accept_reason": "人工审核",
+        "category": "人工审核",
+    }
+    loaded[group_id].set("999999999", record)
+    changes = [("insert", group_id, "999999999", record)]
+    start = time.perf_counter()
+    storage.apply(loaded, changes)
+    apply_seconds = time.perf_counter() - start
+    storage.close()
+
+    return {
+        "mode": mode,
+        "save_ms": round(save_seconds * 1000, 1),
+        "load_ms": round(load_seconds * 1000, 1),
+        "apply_ms": round(apply_seconds * 1000, 2),
+        "size_bytes": directory_size(data_dir),
+    }
+
+
+def run(args) -> list[dict]:
+    results = []
+    for size in args.sizes:
+        records = build_records(size)
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                result = measure(mode, records, Path(tmp_dir))
+            result["records"] = size
+            results.append(result)
+    return results
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(
+        f"{'records':>10} {'mode':>8} {'save_ms':>10} {'load_ms':>10}"
+        f" {'apply_ms':>9} {'size_kb':>10}"
+    )
+    for result in results:
+        print(
+            f"{result['records']:>10} {result['mode']:>8} {result['save_ms']:>10}"
+            f" {result['load_ms']:>10} {result['apply_ms']:>9}"
+            f" {result['size_bytes'] / 1024:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
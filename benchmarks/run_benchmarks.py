@@ -0,0 +1,90 @@
+"""运行全部基准测试，结果以 JSON 输出，便于在插件版本之间对比
+
+不依赖 AstrBot 与网络；未安装的绘图引擎会被跳过。
+
+用法: python benchmarks/run_benchmarks.py [--output result.json] [--quick]
+      [--suites draw_chart chart_output storage serializers keywords]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+import bench_chart_output
+import bench_draw_chart
+import bench_keywords
+import bench_serializers
+import bench_storage
+from _bootstrap import PLUGIN_DIR
+
+SUITES = {
+    "draw_chart": bench_draw_chart,
+    "chart_output": bench_chart_output,
+    "storage": bench_storage,
+    "serializers": bench_serializers,
+    "keywords": bench_keywords,
+}
+
+# --quick 时使用的较小规模，用于快速检查
+QUICK_ARGS = {
+    "draw_chart": [
+        "--members", "10", "1000", "--categories", "1", "8",
+        "--formats", "png", "jpeg", "--repeat", "1",
+    ],
+    "chart_output": ["--repeat", "1"],
+    "storage": ["--sizes", "1000", "10000"],
+    "serializers": ["--sizes", "10000", "100000"],
+    "keywords": ["--keywords", "10", "100", "--comments", "2000", "--repeat", "1"],
+}
+
+
+def plugin_version() -> str:
+    for line in (PLUGIN_DIR / "metadata.yaml").read_text(encoding="utf-8").splitlines():
+        if line.startswith("version:"):
+            return line.split(":", 1)[1].strip()
+    return "unknown"
+
+
+def run_suite(name: str, quick: bool) -> dict:
+    module = SUITES[name]
+    parser = argparse.ArgumentParser()
+    module.add_arguments(parser)
+    args = parser.parse_args(QUICK_ARGS[name] if quick else [])
+    start = time.perf_counter()
+    results = module.run(args)
+    print(
+        f"{name}: {len(results)} 项，耗时 {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+    return {"args": vars(args), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suites", nargs="+", default=list(SUITES), choices=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="使用较小的规模")
+    parser.add_argument(
+        "--output", type=Path, help="结果写入该文件，默认输出到标准输出"
+    )
+    args = parser.parse_args()
+
+    report = {
+        "plugin_version": plugin_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "quick": args.quick,
+        "suites": {name: run_suite(name, args.quick) for name in args.suites},
+    }
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(data, encoding="utf-8")
+    else:
+        print(data)
+
+
+if __name__ == "__main__":
+    main()
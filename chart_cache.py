@@ -0,0 +1,187 @@
+# chart_cache.py
+import hashlib
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# 绘图逻辑变化导致同样输入的图片不同时，调整该版本号使旧缓存失效
+CHART_CACHE_VERSION = 1
+
+
+def file_signature(path: Path) -> tuple[int, ...]:
+    """用文件大小和修改时间代表字体/背景图的内容"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return ()
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def chart_cache_key(
+    group_id: str,
+    summary: dict[str, Any],
+    group_display_name: str,
+    assets_dir: Path,
+    font_name: str,
+    bg_img_name: str,
+    engine: str = "matplotlib",
+    output: tuple = (),
+    max_categories: int = 0,
+) -> str:
+    """根据影响图片内容的全部输入计算缓存键"""
+    payload = {
+        "version": CHART_CACHE_VERSION,
+        "engine": engine,
+        # 输出格式、质量与 dpi
+        "output": list(output),
+        "max_categories": max_categories,
+        # 装饰元素按群号生成
+        "group_id": group_id,
+        "category_counts": sorted(summary.get("category_counts", {}).items()),
+        # 图上的时间只精确到分钟
+        "first_time": summary.get("first_time", "")[:16],
+        "last_time": summary.get("last_time", "")[:16],
+        "group_display_name": group_display_name,
+        "font": [font_name, file_signature(assets_dir / font_name)],
+        "bg_img": [bg_img_name, file_signature(assets_dir / bg_img_name)],
+    }
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def scan_chart_cache(cache_dir: Path) -> list[tuple[str, Path, int]]:
+    """扫描缓存目录，按修改时间从旧到新返回 (缓存键, 路径, 字节数)"""
+    if not cache_dir.exists():
+        return []
+    entries = []
+    # 切换输出格式后旧格式的文件同样载入，之后按 LRU 淘汰
+    for path in cache_dir.iterdir():
+        try:
+            if not path.is_file():
+                continue
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, path.stem, path, stat.st_size))
+    entries.sort()
+    return [(key, path, size) for _, key, path, size in entries]
+
+
+class ChartCache:
+    """按内容寻址的统计图缓存
+
+    文件名即缓存键，按总字节数做 LRU 淘汰。正在发送的图片持有引用计数，
+    被淘汰时先从索引中移除，等最后一个引用释放后才删除文件。
+    本类只维护索引，不做文件 IO：需要删除的文件由调用方在后台线程中删除。
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, suffix: str = ".png"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.entries: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self.total_bytes = 0
+        self.refcounts: dict[Path, int] = {}
+        # 已被淘汰、但仍在使用中的文件
+        self.evicted_paths: set[Path] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def owns(self, path: Path) -> bool:
+        return path.parent == self.cache_dir
+
+    def restore(self, entries: list[tuple[str, Path, int]]) -> list[Path]:
+        """载入启动时扫描到的缓存文件，返回超出容量需要删除的文件"""
+        for key, path, size in entries:
+            if key not in self.entries:
+                self.entries[key] = (path, size)
+                self.total_bytes += size
+        return self._evict()
+
+    def acquire(self, key: str) -> Path | None:
+        """命中时返回缓存图片并增加引用计数"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        path = entry[0]
+        self.refcounts[path] = self.refcounts.get(path, 0) + 1
+        return path
+
+    def retain(self, path: Path):
+        """为已持有引用的图片再增加一个引用，用于多个发送方共享同一张图"""
+        self.refcounts[path] = self.refcounts.get(path, 0) + 1
+
+    def put(self, key: str, size: int) -> tuple[Path, list[Path]]:
+        """登记已写入 path_for(key) 的图片并持有一个引用
+
+        返回缓存路径与被淘汰、需要删除的文件。
+        """
+        path = self.path_for(key)
+        old_entry = self.entries.pop(key, None)
+        if old_entry is not None:
+            self.total_bytes -= old_entry[1]
+        self.evicted_paths.discard(path)
+        self.entries[key] = (path, size)
+        self.total_bytes += size
+        self.refcounts[path] = self.refcounts.get(path, 0) + 1
+        return path, self._evict()
+
+    def release(self, path: Path) -> Path | None:
+        """释放一个引用；文件已被淘汰且不再使用时返回该路径以便删除"""
+        count = self.refcounts.get(path, 0) - 1
+        if count > 0:
+            self.refcounts[path] = count
+            return None
+        self.refcounts.pop(path, None)
+        if path in self.evicted_paths:
+            self.evicted_paths.discard(path)
+            return path
+        return None
+
+    def _evict(self) -> list[Path]:
+        removed = []
+        # 至少保留最近的一张，避免单张图片超过容量时反复重绘
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (path, size) = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            if self.refcounts.get(path):
+                self.evicted_paths.add(path)
+            else:
+                removed.append(path)
+        return removed
+
+
+class MemoryChartCache:
+    """内存中的统计图缓存，直接保存编码后的图片数据，按总字节数做 LRU 淘汰"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        self.total_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> bytes | None:
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        old_data = self.entries.pop(key, None)
+        if old_data is not None:
+            self.total_bytes -= len(old_data)
+        self.entries[key] = data
+        self.total_bytes += len(data)
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
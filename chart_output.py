@@ -0,0 +1,29 @@
+# chart_output.py
+# 统计图的缩放与编码，两种绘图引擎画好原尺寸的图后都经由这里输出
+from pathlib import Path
+from typing import BinaryIO
+
+from PIL import Image
+
+from .chart_style import FIG_DPI, ChartOutput
+
+# PNG 优先编码速度；需要更小的图片时使用 webp / jpeg
+PNG_COMPRESS_LEVEL = 1
+
+
+def encode_chart(image: Image.Image, save_path: Path | BinaryIO, output: ChartOutput):
+    """把按 FIG_DPI 绘制的统计图缩放到 output.dpi 并按 output.format 编码保存"""
+    if output.dpi != FIG_DPI:
+        image = image.resize(output.size, Image.Resampling.LANCZOS)
+    if output.format == "png":
+        image.save(save_path, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+        return
+    # 背景不透明，有损格式不需要透明通道
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if output.format == "webp":
+        image.save(save_path, format="WEBP", quality=output.quality, method=4)
+    elif output.format == "jpeg":
+        image.save(save_path, format="JPEG", quality=output.quality)
+    else:
+        raise ValueError(f"未知的图片格式: {output.format}")
@@ -0,0 +1,115 @@
+# chart_style.py
+# 统计图的画布尺寸、布局与配色，matplotlib 与 Pillow 两种绘图引擎共用
+import heapq
+from typing import NamedTuple
+
+# 定义固定画布大小 (类似手机海报比例 9:16)
+# figsize=(10, 16), dpi=120 -> 输出约 1200x1920 像素
+FIG_W, FIG_H = 10, 16
+FIG_DPI = 120
+# 主内容卡片区域: [left, bottom, width, height]
+CARD_RECT = (0.05, 0.05, 0.9, 0.9)
+# 饼图区域: [left, bottom, width, height]
+PIE_RECT = (0.1, 0.25, 0.8, 0.45)
+
+# 马卡龙/糖果色系 (更鲜艳一点)
+CUTE_COLORS = [
+    "#FFB7C5",  # 樱花粉
+    "#87CEEB",  # 天空蓝
+    "#FFD700",  # 金色
+    "#DDA0DD",  # 梅红
+    "#98FB98",  # 淡绿
+    "#FFA07A",  # 浅鲑红
+    "#B0C4DE",  # 钢蓝
+    "#FF69B4",  # 热粉
+]
+
+# 超出前 N 名的分类合并为“其他”，使用中性色与其他扇区区分
+OTHER_CATEGORY = "其他"
+OTHER_COLOR = "#BDBDBD"
+# “其他”图例中最多列出的分类数
+OTHER_LEGEND_ITEMS = 4
+OTHER_LEGEND_MAX_CHARS = 40
+
+# 静态图层每张约 9MB (1200x1920 RGBA)，只缓存最近用到的几个群
+STATIC_LAYER_CACHE_SIZE = 4
+
+
+def format_time_range(summary: dict) -> str:
+    """统计图上显示的入群时间范围，精确到分钟"""
+    first_time = summary.get("first_time", "")
+    last_time = summary.get("last_time", "")
+    if not (first_time and last_time):
+        return "N/A"
+    start_t = first_time[:-3] if len(first_time) > 16 else first_time
+    end_t = last_time[:-3] if len(last_time) > 16 else last_time
+    return f"{start_t} ~ {end_t}"
+
+
+def select_categories(
+    category_counts: dict[str, int], max_categories: int
+) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+    """按人数从多到少取前 max_categories 个分类作为饼图扇区，其余合并为“其他”
+
+    返回 (扇区, 被合并的分类)，被合并的分类不排序；
+    max_categories 为 0 或分类数不超过 max_categories 时不合并。
+    """
+    items = category_counts.items()
+    if max_categories <= 0 or len(category_counts) <= max_categories:
+        return sorted(items, key=lambda x: x[1], reverse=True), []
+    # 只取前 N 名，用堆选出，不对全部分类排序
+    top = heapq.nlargest(max_categories, items, key=lambda x: x[1])
+    top_names = {name for name, _ in top}
+    folded = [item for item in items if item[0] not in top_names]
+    top.append((OTHER_CATEGORY, sum(count for _, count in folded)))
+    return top, folded
+
+
+def slice_colors(slice_count: int, has_other: bool) -> list[str]:
+    colors = [CUTE_COLORS[i % len(CUTE_COLORS)] for i in range(slice_count)]
+    if has_other:
+        colors[-1] = OTHER_COLOR
+    return colors
+
+
+def format_other_legend(folded: list[tuple[str, int]]) -> str:
+    """“其他”扇区的简要图例，只列出人数最多的几个分类"""
+    shown = heapq.nlargest(OTHER_LEGEND_ITEMS, folded, key=lambda x: x[1])
+    legend = "、".join(f"{name} {count}人" for name, count in shown)
+    if len(folded) > len(shown):
+        legend += " …"
+    legend = f"{OTHER_CATEGORY} ({len(folded)} 类): {legend}"
+    if len(legend) > OTHER_LEGEND_MAX_CHARS:
+        legend = f"{legend[: OTHER_LEGEND_MAX_CHARS - 1]}…"
+    return legend
+
+
+def format_group_title(group_id: str, group_display_name: str) -> str:
+    chart_group_name = group_display_name or group_id
+    if len(chart_group_name) > 14:
+        chart_group_name = f"{chart_group_name[:13]}…"
+    return chart_group_name
+
+
+# 输出格式 -> 文件后缀
+CHART_FORMATS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+
+
+class ChartOutput(NamedTuple):
+    """统计图的输出尺寸与编码
+
+    画布比例固定为 FIG_W x FIG_H 英寸，dpi 决定输出像素；
+    quality 只对 webp / jpeg 生效。
+    """
+
+    format: str = "png"
+    quality: int = 85
+    dpi: int = FIG_DPI
+
+    @property
+    def suffix(self) -> str:
+        return CHART_FORMATS[self.format]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return round(FIG_W * self.dpi), round(FIG_H * self.dpi)
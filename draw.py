@@ -4,8 +4,10 @@ import matplotlib
 # 设置后端为 Agg，防止在无 GUI 环境下报错
 matplotlib.use("Agg")
 
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
 import matplotlib.image as mpimg
 import matplotlib.lines as lines
@@ -13,12 +15,32 @@ import matplotlib.patches as mpatches
 import matplotlib.patheffects as path_effects
 import numpy as np
 from matplotlib import font_manager
+from matplotlib.artist import Artist
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure
 from matplotlib.patches import FancyBboxPatch
+from PIL import Image
 
 from astrbot.api import logger
 
+from .chart_cache import file_signature
+from .chart_output import encode_chart
+from .chart_style import (
+    CARD_RECT,
+    CUTE_COLORS,
+    FIG_DPI,
+    FIG_H,
+    FIG_W,
+    PIE_RECT,
+    STATIC_LAYER_CACHE_SIZE,
+    ChartOutput,
+    format_group_title,
+    format_other_legend,
+    format_time_range,
+    select_categories,
+    slice_colors,
+)
+
 
 def get_mpl_font_prop(assets_dir: Path, font_name: str) -> font_manager.FontProperties:
     """获取 Matplotlib 用的字体属性"""
@@ -34,134 +56,251 @@ def get_mpl_font_prop(assets_dir: Path, font_name: str) -> font_manager.FontProp
     return font_manager.FontProperties(family=default_fonts)
 
 
+@lru_cache(maxsize=2)
+def _decode_background(bg_path: Path, signature: tuple[int, ...]) -> np.ndarray:
+    return mpimg.imread(str(bg_path))
+
+
+def load_background(bg_path: Path) -> np.ndarray:
+    """读取并缓存解码后的背景图，文件被替换后自动重新读取"""
+    return _decode_background(bg_path, file_signature(bg_path))
+
+
+def prewarm(assets_dir: Path, font_name: str, bg_img_name: str):
+    """预先加载字体与背景图，供渲染进程启动时调用"""
+    font_prop = get_mpl_font_prop(assets_dir, font_name)
+    font_manager.findfont(font_prop)
+    bg_path = assets_dir / bg_img_name
+    if bg_path.exists():
+        try:
+            load_background(bg_path)
+        except Exception as e:
+            logger.warning(f"背景加载失败: {e}")
+
+
+class StaticLayerArtist(Artist):
+    """把预渲染的 RGBA 图层原样贴到画布上，不经过 figimage 的重采样
+
+    layer 的行序为自下而上，与 Agg 的 draw_image 一致。
+    """
+
+    def __init__(self, layer: np.ndarray):
+        super().__init__()
+        self.layer = layer
+        self.set_zorder(-1)
+
+    def draw(self, renderer):
+        gc = renderer.new_gc()
+        renderer.draw_image(gc, 0, 0, self.layer)
+        gc.restore()
+
+
+def _new_figure() -> Figure:
+    fig = Figure(figsize=(FIG_W, FIG_H), dpi=FIG_DPI)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _draw_static_layer(
+    fig: Figure,
+    group_id: str,
+    assets_dir: Path,
+    font_prop: font_manager.FontProperties,
+    bg_img_name: str,
+) -> tuple[tuple[float, float], tuple[float, float]]:
+    """绘制与统计数据无关的部分：背景、卡片、装饰元素与底部版权
+
+    返回卡片坐标系的 (xlim, ylim)：装饰散点会改变卡片的坐标范围，
+    标题等文字需要在同样的坐标范围内绘制才能与原位置一致。
+    """
+    # --- 绘制背景层 ---
+    # 创建全屏 Axes 用于放背景图
+    bg_ax = fig.add_axes((0, 0, 1, 1))
+    bg_ax.axis("off")
+
+    bg_path = assets_dir / bg_img_name
+    has_bg_img = False
+    if bg_path.exists():
+        try:
+            img = load_background(bg_path)
+            # aspect='auto' 强制拉伸填满固定大小的画布
+            bg_ax.imshow(img, aspect="auto", alpha=1.0, zorder=0)
+            has_bg_img = True
+        except Exception as e:
+            logger.warning(f"背景加载失败: {e}")
+
+    if not has_bg_img:
+        # 纯色背景回退
+        bg_ax.set_facecolor("#FFF0F5")  # 薰衣草红
+
+    # --- 绘制半透明磨砂卡片 (核心美化) ---
+    # 在画布中间画一个圆角矩形，作为主内容区
+    card_ax = fig.add_axes(CARD_RECT)
+    card_ax.axis("off")
+
+    # 绘制圆角矩形背景 (白色，半透明)
+    round_box = FancyBboxPatch(
+        (0, 0),
+        1,
+        1,
+        boxstyle="round,pad=0,rounding_size=0.08",
+        fc="white",
+        ec="#FFB7C5",
+        alpha=0.85,
+        transform=card_ax.transAxes,
+        linewidth=2,
+        zorder=0,
+    )
+    card_ax.add_patch(round_box)
+
+    # --- 装饰元素 (星星和点点) ---
+    # 在卡片上随机撒一点装饰，按群号固定随机种子
+    rng = np.random.RandomState(sum(ord(c) for c in group_id))
+    for _ in range(30):
+        x = rng.uniform(0.05, 0.95)
+        y = rng.uniform(0.05, 0.95)
+        # 随机选择 星星(*) 或 圆点(o)
+        marker = rng.choice(["*", "o", "h"])
+        color = rng.choice(CUTE_COLORS)
+        size = rng.uniform(100, 400)
+        card_ax.scatter(
+            x,
+            y,
+            s=size,
+            c=color,
+            marker=marker,
+            alpha=0.3,
+            zorder=1,
+            edgecolors="none",
+        )
+
+    # --- 底部版权区域 ---
+    line = lines.Line2D(
+        [0.15, 0.85],
+        [0.12, 0.12],
+        color="#FFB6C1",
+        lw=2,
+        linestyle="--",
+        transform=card_ax.transAxes,
+    )
+    card_ax.add_line(line)
+
+    card_ax.text(
+        0.5,
+        0.08,
+        "AstrBot Plugin - JoinManager",
+        ha="center",
+        fontproperties=font_prop,
+        fontsize=18,
+        color="#AAAAAA",
+    )
+    card_ax.text(
+        0.5,
+        0.05,
+        "Powered by 清蒸云鸭",
+        ha="center",
+        fontproperties=font_prop,
+        fontsize=14,
+        color="#CCCCCC",
+    )
+    return card_ax.get_xlim(), card_ax.get_ylim()
+
+
+@lru_cache(maxsize=STATIC_LAYER_CACHE_SIZE)
+def _render_static_layer(
+    group_id: str,
+    assets_dir: Path,
+    font_name: str,
+    bg_img_name: str,
+    font_signature: tuple[int, ...],
+    bg_signature: tuple[int, ...],
+) -> tuple[np.ndarray, tuple[float, float], tuple[float, float]]:
+    # 文件签名只参与缓存键，字体或背景图被替换后自动重新渲染
+    fig = _new_figure()
+    font_prop = get_mpl_font_prop(assets_dir, font_name)
+    card_xlim, card_ylim = _draw_static_layer(
+        fig, group_id, assets_dir, font_prop, bg_img_name
+    )
+    fig.canvas.draw()
+    # 画布缓冲区自上而下，翻转为 draw_image 需要的自下而上
+    buffer = np.asarray(fig.canvas.buffer_rgba())  # type: ignore
+    layer = np.ascontiguousarray(buffer[::-1])
+    fig.clf()
+    return layer, card_xlim, card_ylim
+
+
+def get_static_layer(
+    group_id: str, assets_dir: Path, font_name: str, bg_img_name: str
+) -> tuple[np.ndarray, tuple[float, float], tuple[float, float]]:
+    """获取预渲染的静态图层 (RGBA) 及卡片坐标范围，按 背景图、字体、群号 缓存
+
+    图层在多次绘图间共享，调用方不得修改。
+    """
+    return _render_static_layer(
+        group_id,
+        assets_dir,
+        font_name,
+        bg_img_name,
+        file_signature(assets_dir / font_name),
+        file_signature(assets_dir / bg_img_name),
+    )
+
+
 def draw_chart(
     group_id: str,
-    group_data: dict[str, Any],
-    save_path: Path,
+    summary: dict[str, Any],
+    save_path: Path | BinaryIO,
     assets_dir: Path,
     font_name: str = "cute_font.ttf",
     bg_img_name: str = "bg.png",
     group_display_name: str = "",
+    output: ChartOutput | None = None,
+    max_categories: int = 0,
 ) -> bool:
     """
     绘制统计图表 (美化版：卡片风格 + 可爱元素 + 修复类型报错)
     由Gemini驱动~
+
+    summary 为群统计摘要: category_counts / first_time / last_time
+    save_path 可以是文件路径，也可以是 BytesIO 等可写的二进制对象。
+    output 为输出尺寸与编码，默认按原尺寸输出 PNG。
+    max_categories 大于 0 时只为人数最多的前 N 个分类绘制扇区，其余合并为“其他”。
+    背景、卡片、装饰与版权信息来自缓存的静态图层，这里只绘制饼图和文字。
     """
-    if not group_data:
+    category_counts: dict[str, int] = summary.get("category_counts", {})
+    if not category_counts:
         return False
 
     # --- 1. 数据处理 ---
-    category_counts = {}
-    all_times = []
-    for user_data in group_data.values():
-        cat = user_data.get("category", "未知")
-        category_counts[cat] = category_counts.get(cat, 0) + 1
-        t_str = user_data.get("accept_time", "")
-        if t_str:
-            all_times.append(t_str)
-
-    sorted_data = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)
-
-    time_range_str = "N/A"
-    if all_times:
-        all_times.sort()
-        start_t = all_times[0][:-3] if len(all_times[0]) > 16 else all_times[0]
-        end_t = all_times[-1][:-3] if len(all_times[-1]) > 16 else all_times[-1]
-        time_range_str = f"{start_t} ~ {end_t}"
+    sorted_data, folded = select_categories(category_counts, max_categories)
+    colors = slice_colors(len(sorted_data), bool(folded))
+
+    time_range_str = format_time_range(summary)
 
     total_people = sum(category_counts.values())
 
     # --- 2. 基础设置 ---
-    # 马卡龙/糖果色系 (更鲜艳一点)
-    cute_colors = [
-        "#FFB7C5",  # 樱花粉
-        "#87CEEB",  # 天空蓝
-        "#FFD700",  # 金色
-        "#DDA0DD",  # 梅红
-        "#98FB98",  # 淡绿
-        "#FFA07A",  # 浅鲑红
-        "#B0C4DE",  # 钢蓝
-        "#FF69B4",  # 热粉
-    ]
-
     font_prop = get_mpl_font_prop(assets_dir, font_name)
 
-    # 定义固定画布大小 (类似手机海报比例 9:16)
-    # figsize=(10, 16), dpi=120 -> 输出约 1200x1920 像素
-    FIG_W, FIG_H = 10, 16
-    fig = Figure(figsize=(FIG_W, FIG_H), dpi=120)
-    FigureCanvasAgg(fig)
-
     # 文字特效
     stroke_white = path_effects.withStroke(linewidth=5, foreground="white", alpha=1.0)
 
     try:
-        # --- 3. 绘制背景层 ---
-        # 创建全屏 Axes 用于放背景图
-        bg_ax = fig.add_axes((0, 0, 1, 1))
-        bg_ax.axis("off")
-
-        bg_path = assets_dir / bg_img_name
-        has_bg_img = False
-        if bg_path.exists():
-            try:
-                img = mpimg.imread(str(bg_path))
-                # aspect='auto' 强制拉伸填满固定大小的画布
-                bg_ax.imshow(img, aspect="auto", alpha=1.0, zorder=0)
-                has_bg_img = True
-            except Exception as e:
-                logger.warning(f"背景加载失败: {e}")
-
-        if not has_bg_img:
-            # 纯色背景回退
-            bg_ax.set_facecolor("#FFF0F5")  # 薰衣草红
-
-        # --- 4. 绘制半透明磨砂卡片 (核心美化) ---
-        # 在画布中间画一个圆角矩形，作为主内容区
-        # 坐标(0.05, 0.05) 宽度0.9 高度0.9
-        card_ax = fig.add_axes((0.05, 0.05, 0.9, 0.9))
-        card_ax.axis("off")
-
-        # 绘制圆角矩形背景 (白色，半透明)
-        round_box = FancyBboxPatch(
-            (0, 0),
-            1,
-            1,
-            boxstyle="round,pad=0,rounding_size=0.08",
-            fc="white",
-            ec="#FFB7C5",
-            alpha=0.85,
-            transform=card_ax.transAxes,
-            linewidth=2,
-            zorder=0,
+        # --- 3. 静态图层 (背景 + 卡片 + 装饰 + 版权) ---
+        static_layer, card_xlim, card_ylim = get_static_layer(
+            group_id, assets_dir, font_name, bg_img_name
         )
-        card_ax.add_patch(round_box)
-
-        # --- 5. 装饰元素 (星星和点点) ---
-        # 在卡片上随机撒一点装饰
-        np.random.seed(sum(ord(c) for c in group_id))
-        for _ in range(30):
-            x = np.random.uniform(0.05, 0.95)
-            y = np.random.uniform(0.05, 0.95)
-            # 随机选择 星星(*) 或 圆点(o)
-            marker = np.random.choice(["*", "o", "h"])
-            color = np.random.choice(cute_colors)
-            size = np.random.uniform(100, 400)
-            card_ax.scatter(
-                x,
-                y,
-                s=size,
-                c=color,
-                marker=marker,
-                alpha=0.3,
-                zorder=1,
-                edgecolors="none",
-            )
+        fig = _new_figure()
+        fig.add_artist(StaticLayerArtist(static_layer))
 
-        # --- 6. 绘制饼图 (主图表) ---
+        # 与静态图层中卡片相同的坐标系，用于放置标题等文字
+        card_ax = fig.add_axes(CARD_RECT)
+        card_ax.axis("off")
+        card_ax.set_xlim(card_xlim)
+        card_ax.set_ylim(card_ylim)
+        # --- 4. 绘制饼图 (主图表) ---
         # 重新建立一个 Axes 用于画饼图，确保位置居中
-        # 参数: [left, bottom, width, height]
-        pie_ax = fig.add_axes((0.1, 0.25, 0.8, 0.45))
+        pie_ax = fig.add_axes(PIE_RECT)
         pie_ax.axis("equal")
 
         labels = [f"{item[0]}\n({item[1]}人)" for item in sorted_data]
@@ -173,7 +312,7 @@ def draw_chart(
             labels=labels,
             autopct="%1.1f%%",
             startangle=90,
-            colors=cute_colors[: len(sizes)],
+            colors=colors,
             explode=explode,
             shadow=False,
             radius=1.0,
@@ -203,7 +342,7 @@ def draw_chart(
         for i, text in enumerate(texts):
             text.set_fontproperties(font_prop)
             text.set_fontsize(24)
-            text.set_color(cute_colors[i % len(cute_colors)])  # 标签颜色跟随饼块
+            text.set_color(colors[i])  # 标签颜色跟随饼块
             text.set_path_effects([stroke_white])
 
         for autotext in autotexts:  # type: ignore
@@ -214,9 +353,9 @@ def draw_chart(
                 [path_effects.withStroke(linewidth=3, foreground="#FFB7C5")]
             )
 
-        # --- 7. 文本信息绘制 ---
+        # --- 5. 文本信息绘制 ---
 
-        # 7.1 中间圆心统计
+        # 5.1 中间圆心统计
         pie_ax.text(
             0,
             0.25,
@@ -239,11 +378,9 @@ def draw_chart(
             path_effects=[stroke_white],
         )
 
-        # 7.2 顶部标题区域 (使用 card_ax 坐标系)
+        # 5.2 顶部标题区域 (使用 card_ax 坐标系)
         # 标题
-        chart_group_name = group_display_name or group_id
-        if len(chart_group_name) > 14:
-            chart_group_name = f"{chart_group_name[:13]}…"
+        chart_group_name = format_group_title(group_id, group_display_name)
         card_ax.text(
             0.5,
             0.92,
@@ -286,38 +423,31 @@ def draw_chart(
             },
         )
 
-        # 底部版权区域
-        line = lines.Line2D(
-            [0.15, 0.85],
-            [0.12, 0.12],
-            color="#FFB6C1",
-            lw=2,
-            linestyle="--",
-            transform=card_ax.transAxes,
-        )
-        card_ax.add_line(line)
-
-        card_ax.text(
-            0.5,
-            0.08,
-            "AstrBot Plugin - JoinManager",
-            ha="center",
-            fontproperties=font_prop,
-            fontsize=18,
-            color="#AAAAAA",
-        )
-        card_ax.text(
-            0.5,
-            0.05,
-            "Powered by 清蒸云鸭",
-            ha="center",
-            fontproperties=font_prop,
-            fontsize=14,
-            color="#CCCCCC",
-        )
+        # 被合并为“其他”的分类在饼图下方简要列出
+        if folded:
+            card_ax.text(
+                0.5,
+                0.165,
+                format_other_legend(folded),
+                ha="center",
+                va="center",
+                fontproperties=font_prop,
+                fontsize=16,
+                color="#999999",
+            )
 
         # --- 保存 ---
-        fig.savefig(str(save_path))
+        fig.canvas.draw()
+        image = Image.frombuffer(
+            "RGBA",
+            fig.canvas.get_width_height(),
+            fig.canvas.buffer_rgba(),  # type: ignore
+            "raw",
+            "RGBA",
+            0,
+            1,
+        )
+        encode_chart(image, save_path, output or ChartOutput())
         fig.clf()
         logger.info(f"生成{group_id}图表成功！")
         return True
@@ -328,3 +458,30 @@ def draw_chart(
 
         logger.error(traceback.format_exc())
         return False
+
+
+def render_chart_bytes(
+    group_id: str,
+    summary: dict[str, Any],
+    assets_dir: Path,
+    font_name: str = "cute_font.ttf",
+    bg_img_name: str = "bg.png",
+    group_display_name: str = "",
+    output: ChartOutput | None = None,
+    max_categories: int = 0,
+) -> bytes | None:
+    """绘制统计图并直接返回编码后的图片数据，不写入磁盘"""
+    buffer = BytesIO()
+    if not draw_chart(
+        group_id,
+        summary,
+        buffer,
+        assets_dir,
+        font_name,
+        bg_img_name,
+        group_display_name,
+        output,
+        max_categories,
+    ):
+        return None
+    return buffer.getvalue()
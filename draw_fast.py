@@ -0,0 +1,540 @@
+# draw_fast.py
+"""仅使用 Pillow 的轻量统计图绘制
+
+与 draw.py 的卡片样式一致 (背景、半透明卡片、装饰、甜甜圈饼图与文字)，
+不依赖 matplotlib / numpy，导入与绘图都更快，绘图进程占用的内存也更少。
+"""
+
+import math
+import random
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+from astrbot.api import logger
+
+from .chart_cache import file_signature
+from .chart_output import encode_chart
+from .chart_style import (
+    CARD_RECT,
+    CUTE_COLORS,
+    FIG_DPI,
+    FIG_H,
+    FIG_W,
+    PIE_RECT,
+    STATIC_LAYER_CACHE_SIZE,
+    ChartOutput,
+    format_group_title,
+    format_other_legend,
+    format_time_range,
+    select_categories,
+    slice_colors,
+)
+
+WIDTH = FIG_W * FIG_DPI
+HEIGHT = FIG_H * FIG_DPI
+# 形状先按该倍数绘制再缩小，代替抗锯齿
+SUPERSAMPLE = 2
+# 自定义字体不可用时按顺序尝试的系统字体
+FALLBACK_FONTS = ["simhei.ttf", "msyh.ttc", "msyh.ttf", "Arial Unicode.ttf"]
+
+FontType = ImageFont.FreeTypeFont | ImageFont.ImageFont
+
+_STAR_INNER_RATIO = 0.381966
+
+
+def _pt(points: float) -> float:
+    """磅转换为像素，与 matplotlib 中的字号、线宽一致"""
+    return points * FIG_DPI / 72
+
+
+def _rgba(color: str, alpha: float = 1.0) -> tuple[int, int, int, int]:
+    color = color.lstrip("#")
+    return (
+        int(color[0:2], 16),
+        int(color[2:4], 16),
+        int(color[4:6], 16),
+        round(alpha * 255),
+    )
+
+
+def _fig_box(rect: tuple[float, float, float, float]) -> tuple[float, ...]:
+    """把 [left, bottom, width, height] 的画布比例换算为像素 (左, 上, 右, 下)"""
+    left, bottom, width, height = rect
+    return (
+        left * WIDTH,
+        (1 - bottom - height) * HEIGHT,
+        (left + width) * WIDTH,
+        (1 - bottom) * HEIGHT,
+    )
+
+
+def _card_point(x: float, y: float) -> tuple[float, float]:
+    """卡片坐标 (左下为原点的 0~1 比例) 换算为像素"""
+    left, top, right, bottom = _fig_box(CARD_RECT)
+    return left + x * (right - left), bottom - y * (bottom - top)
+
+
+@lru_cache(maxsize=32)
+def _load_font(font_path: str, signature: tuple[int, ...], size: int) -> FontType:
+    return ImageFont.truetype(font_path, size)
+
+
+def get_font(assets_dir: Path, font_name: str, points: float) -> FontType:
+    """获取 Pillow 用的字体，字号单位为磅"""
+    size = round(_pt(points))
+    font_path = assets_dir / font_name
+    if font_path.exists():
+        try:
+            return _load_font(str(font_path), file_signature(font_path), size)
+        except Exception as e:
+            logger.warning(f"[JoinManager] 自定义字体加载失败: {e}")
+
+    # 回退字体
+    for fallback in FALLBACK_FONTS:
+        try:
+            return _load_font(fallback, (), size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def _rounded_box_points(
+    box: tuple[float, ...], rx: float, ry: float, steps: int = 16
+) -> list[tuple[float, float]]:
+    """圆角矩形的轮廓点，圆角为椭圆弧 (与 matplotlib 按坐标轴比例缩放的圆角一致)"""
+    left, top, right, bottom = box
+    corners = (
+        (right - rx, top + ry, -90),
+        (right - rx, bottom - ry, 0),
+        (left + rx, bottom - ry, 90),
+        (left + rx, top + ry, 180),
+    )
+    points = []
+    for cx, cy, start in corners:
+        for step in range(steps + 1):
+            angle = math.radians(start + 90 * step / steps)
+            points.append((cx + rx * math.cos(angle), cy + ry * math.sin(angle)))
+    return points
+
+
+def _marker_points(
+    marker: str, cx: float, cy: float, radius: float
+) -> list[tuple[float, float]]:
+    if marker == "*":
+        points = []
+        for i in range(10):
+            r = radius if i % 2 == 0 else radius * _STAR_INNER_RATIO
+            angle = math.radians(90 + 36 * i)
+            points.append((cx + r * math.cos(angle), cy - r * math.sin(angle)))
+        return points
+    # 六边形，顶点朝上
+    return [
+        (
+            cx + radius * math.cos(math.radians(90 + 60 * i)),
+            cy - radius * math.sin(math.radians(90 + 60 * i)),
+        )
+        for i in range(6)
+    ]
+
+
+def _draw_text(
+    draw: ImageDraw.ImageDraw,
+    xy: tuple[float, float],
+    text: str,
+    font: FontType,
+    fill: str,
+    anchor: str = "mm",
+    stroke_points: float = 0,
+    stroke_fill: str = "white",
+    align: str = "center",
+):
+    # matplotlib 的描边线宽是总宽度，Pillow 的 stroke_width 为单侧宽度
+    stroke_width = round(_pt(stroke_points) / 2)
+    if "\n" in text:
+        draw.multiline_text(
+            xy,
+            text,
+            font=font,
+            fill=fill,
+            anchor=anchor,
+            align=align,
+            stroke_width=stroke_width,
+            stroke_fill=stroke_fill,
+        )
+    else:
+        draw.text(
+            xy,
+            text,
+            font=font,
+            fill=fill,
+            anchor=anchor,
+            stroke_width=stroke_width,
+            stroke_fill=stroke_fill,
+        )
+
+
+def _draw_static_layer(
+    group_id: str, title: str, assets_dir: Path, font_name: str, bg_img_name: str
+) -> Image.Image:
+    """绘制与统计数据无关的部分：背景、卡片、装饰元素、顶部标题与底部版权"""
+    # --- 背景层 ---
+    canvas = None
+    bg_path = assets_dir / bg_img_name
+    if bg_path.exists():
+        try:
+            with Image.open(bg_path) as bg_img:
+                # 与 matplotlib 的 aspect='auto' 一致，拉伸填满画布
+                canvas = bg_img.convert("RGBA").resize(
+                    (WIDTH, HEIGHT), Image.Resampling.BILINEAR
+                )
+        except Exception as e:
+            logger.warning(f"背景加载失败: {e}")
+    if canvas is None:
+        # 纯色背景回退
+        canvas = Image.new("RGBA", (WIDTH, HEIGHT), _rgba("#FFF0F5"))
+
+    # --- 卡片与装饰 (放大绘制后缩小) ---
+    overlay = Image.new("RGBA", (WIDTH * SUPERSAMPLE, HEIGHT * SUPERSAMPLE))
+    draw = ImageDraw.Draw(overlay)
+    card_box = tuple(value * SUPERSAMPLE for value in _fig_box(CARD_RECT))
+    card_w = card_box[2] - card_box[0]
+    card_h = card_box[3] - card_box[1]
+    outline = _rounded_box_points(card_box, card_w * 0.08, card_h * 0.08)
+    draw.polygon(outline, fill=_rgba("#FFFFFF", 0.85))
+    draw.line(
+        [*outline, outline[0]],
+        fill=_rgba("#FFB7C5", 0.85),
+        width=round(_pt(2) * SUPERSAMPLE),
+        joint="curve",
+    )
+    canvas.alpha_composite(overlay.reduce(SUPERSAMPLE))
+
+    # 装饰元素按群号固定随机种子，半透明叠加在卡片上
+    overlay = Image.new("RGBA", (WIDTH * SUPERSAMPLE, HEIGHT * SUPERSAMPLE))
+    draw = ImageDraw.Draw(overlay)
+    rng = random.Random(sum(ord(c) for c in group_id))
+    for _ in range(30):
+        x = rng.uniform(0.05, 0.95)
+        y = rng.uniform(0.05, 0.95)
+        marker = rng.choice(["*", "o", "h"])
+        color = _rgba(rng.choice(CUTE_COLORS))
+        size = rng.uniform(100, 400)
+        cx, cy = _card_point(x, y)
+        cx *= SUPERSAMPLE
+        cy *= SUPERSAMPLE
+        # scatter 的 s 为标记面积 (磅²)
+        radius = _pt(math.sqrt(size)) / 2 * SUPERSAMPLE
+        if marker == "o":
+            draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius), color)
+        else:
+            draw.polygon(_marker_points(marker, cx, cy, radius), color)
+    overlay = overlay.reduce(SUPERSAMPLE)
+    overlay.putalpha(overlay.getchannel("A").point(lambda value: value * 3 // 10))
+    canvas.alpha_composite(overlay)
+
+    draw = ImageDraw.Draw(canvas)
+    # --- 顶部标题区域 ---
+    _draw_text(
+        draw,
+        _card_point(0.5, 0.92),
+        title,
+        get_font(assets_dir, font_name, 28),
+        "#87CEEB",
+        stroke_points=5,
+    )
+    _draw_text(
+        draw,
+        _card_point(0.5, 0.86),
+        "✨ 成员来源大统计 ✨",
+        get_font(assets_dir, font_name, 42),
+        "#FF69B4",
+        stroke_points=5,
+    )
+
+    # --- 底部版权区域 ---
+    line_y = _card_point(0, 0.12)[1]
+    line_start = _card_point(0.15, 0.12)[0]
+    line_end = _card_point(0.85, 0.12)[0]
+    # 与 matplotlib 的 "--" 线型一致: 线段 3.7 倍线宽，间隔 1.6 倍线宽
+    dash, gap = _pt(2 * 3.7), _pt(2 * 1.6)
+    x = line_start
+    while x < line_end:
+        draw.line(
+            ((x, line_y), (min(x + dash, line_end), line_y)),
+            fill="#FFB6C1",
+            width=round(_pt(2)),
+        )
+        x += dash + gap
+
+    _draw_text(
+        draw,
+        _card_point(0.5, 0.08),
+        "AstrBot Plugin - JoinManager",
+        get_font(assets_dir, font_name, 18),
+        "#AAAAAA",
+        anchor="ms",
+    )
+    _draw_text(
+        draw,
+        _card_point(0.5, 0.05),
+        "Powered by 清蒸云鸭",
+        get_font(assets_dir, font_name, 14),
+        "#CCCCCC",
+        anchor="ms",
+    )
+    # 背景不透明，之后的绘制与编码都在 RGB 上进行
+    return canvas.convert("RGB")
+
+
+@lru_cache(maxsize=STATIC_LAYER_CACHE_SIZE)
+def _render_static_layer(
+    group_id: str,
+    title: str,
+    assets_dir: Path,
+    font_name: str,
+    bg_img_name: str,
+    font_signature: tuple[int, ...],
+    bg_signature: tuple[int, ...],
+) -> Image.Image:
+    # 文件签名只参与缓存键，字体或背景图被替换后自动重新渲染
+    return _draw_static_layer(group_id, title, assets_dir, font_name, bg_img_name)
+
+
+def get_static_layer(
+    group_id: str, title: str, assets_dir: Path, font_name: str, bg_img_name: str
+) -> Image.Image:
+    """获取预渲染的静态图层，按 背景图、字体、群号、标题 缓存；调用方需先 copy 再绘制"""
+    return _render_static_layer(
+        group_id,
+        title,
+        assets_dir,
+        font_name,
+        bg_img_name,
+        file_signature(assets_dir / font_name),
+        file_signature(assets_dir / bg_img_name),
+    )
+
+
+def prewarm(assets_dir: Path, font_name: str, bg_img_name: str):
+    """预先加载字体，供渲染进程启动时调用"""
+    for points in (14, 16, 18, 20, 22, 24, 28, 42, 58):
+        get_font(assets_dir, font_name, points)
+
+
+def _draw_pie(
+    canvas: Image.Image,
+    sorted_data: list[tuple[str, int]],
+    colors: list[str],
+    assets_dir: Path,
+    font_name: str,
+):
+    """绘制甜甜圈饼图、标签、百分比和中心总数"""
+    total_people = sum(count for _, count in sorted_data)
+    pie_left, pie_top, pie_right, pie_bottom = _fig_box(PIE_RECT)
+    center_x = (pie_left + pie_right) / 2
+    center_y = (pie_top + pie_bottom) / 2
+    # 与 matplotlib 一致: 饼图横向坐标范围为 ±1.25，纵向等比例
+    scale = (pie_right - pie_left) / 2.5
+    radius = scale
+
+    # 扇区只在饼图所在的区域内放大绘制，再缩小贴回画布；
+    # 区域刚好容纳外移后的扇区 (描边画在扇区内侧)，放大绘制与缩小的像素数更少
+    extent = math.ceil(radius * 1.04) + 1
+    origin_x = round(center_x) - extent
+    origin_y = round(center_y) - extent
+    overlay = Image.new("RGBA", (extent * 2 * SUPERSAMPLE,) * 2)
+    draw = ImageDraw.Draw(overlay)
+
+    def local(x: float, y: float) -> tuple[float, float]:
+        return (x - origin_x) * SUPERSAMPLE, (y - origin_y) * SUPERSAMPLE
+
+    edge_width = round(_pt(3) * SUPERSAMPLE)
+    wedges = []
+    theta = 90.0
+    for index, (_, count) in enumerate(sorted_data):
+        sweep = 360 * count / total_people
+        middle = math.radians(theta + sweep / 2)
+        # explode=0.04，扇区沿中线方向外移
+        wx = center_x + 0.04 * radius * math.cos(middle)
+        wy = center_y - 0.04 * radius * math.sin(middle)
+        wedges.append((wx, wy, middle))
+        box = (*local(wx - radius, wy - radius), *local(wx + radius, wy + radius))
+        color = _rgba(colors[index], 0.9)
+        # Pillow 的角度顺时针为正，matplotlib 逆时针为正
+        if sweep >= 360:
+            draw.ellipse(box, fill=color, outline="white", width=edge_width)
+        else:
+            draw.pieslice(
+                box,
+                -(theta + sweep),
+                -theta,
+                fill=color,
+                outline="white",
+                width=edge_width,
+            )
+        theta += sweep
+
+    # 中心白圆 (甜甜圈的洞)
+    hole = 0.60 * radius * SUPERSAMPLE
+    cx, cy = local(center_x, center_y)
+    draw.ellipse(
+        (cx - hole, cy - hole, cx + hole, cy + hole),
+        fill="white",
+        outline="#FFB7C5",
+        width=round(_pt(4) * SUPERSAMPLE),
+    )
+    overlay = overlay.reduce(SUPERSAMPLE)
+    canvas.paste(overlay, (origin_x, origin_y), overlay)
+
+    draw = ImageDraw.Draw(canvas)
+    label_font = get_font(assets_dir, font_name, 24)
+    pct_font = get_font(assets_dir, font_name, 18)
+    for index, ((category, count), (wx, wy, middle)) in enumerate(
+        zip(sorted_data, wedges)
+    ):
+        cos_m, sin_m = math.cos(middle), math.sin(middle)
+        # 标签在 1.15 倍半径处，左右两侧分别右对齐/左对齐
+        lx = wx + 1.15 * radius * cos_m
+        ly = wy - 1.15 * radius * sin_m
+        on_right = cos_m > 0
+        _draw_text(
+            draw,
+            (lx, ly),
+            f"{category}\n({count}人)",
+            label_font,
+            colors[index],
+            anchor="lm" if on_right else "rm",
+            stroke_points=5,
+            align="left" if on_right else "right",
+        )
+        _draw_text(
+            draw,
+            (wx + 0.80 * radius * cos_m, wy - 0.80 * radius * sin_m),
+            f"{100 * count / total_people:1.1f}%",
+            pct_font,
+            "white",
+            stroke_points=3,
+            stroke_fill="#FFB7C5",
+        )
+
+    # 中间圆心统计
+    _draw_text(
+        draw,
+        (center_x, center_y - 0.25 * scale),
+        "总计",
+        get_font(assets_dir, font_name, 22),
+        "#888888",
+    )
+    _draw_text(
+        draw,
+        (center_x, center_y + 0.15 * scale),
+        str(total_people),
+        get_font(assets_dir, font_name, 58),
+        "#FF69B4",
+        stroke_points=5,
+    )
+
+
+def _draw_time_capsule(
+    draw: ImageDraw.ImageDraw, time_range_str: str, assets_dir: Path, font_name: str
+):
+    # 时间胶囊 (圆角框)，内边距为 0.8 倍字号
+    font = get_font(assets_dir, font_name, 20)
+    text = f"📅 统计时间: {time_range_str}"
+    cx, cy = _card_point(0.5, 0.78)
+    left, top, right, bottom = draw.textbbox((cx, cy), text, font=font, anchor="mm")
+    pad = _pt(20 * 0.8)
+    draw.rounded_rectangle(
+        (left - pad, top - pad, right + pad, bottom + pad),
+        radius=_pt(20 * 0.5),
+        fill="#F0F8FF",
+        outline="#87CEEB",
+        width=round(_pt(2)),
+    )
+    _draw_text(draw, (cx, cy), text, font, "#9370DB")
+
+
+def draw_chart(
+    group_id: str,
+    summary: dict[str, Any],
+    save_path: Path | BinaryIO,
+    assets_dir: Path,
+    font_name: str = "cute_font.ttf",
+    bg_img_name: str = "bg.png",
+    group_display_name: str = "",
+    output: ChartOutput | None = None,
+    max_categories: int = 0,
+) -> bool:
+    """绘制统计图表，参数与 draw.draw_chart 相同"""
+    category_counts: dict[str, int] = summary.get("category_counts", {})
+    if not category_counts:
+        return False
+
+    sorted_data, folded = select_categories(category_counts, max_categories)
+    colors = slice_colors(len(sorted_data), bool(folded))
+    time_range_str = format_time_range(summary)
+
+    try:
+        # 标题只与群号、群名称有关，随静态图层一起缓存
+        canvas = get_static_layer(
+            group_id,
+            format_group_title(group_id, group_display_name),
+            assets_dir,
+            font_name,
+            bg_img_name,
+        ).copy()
+        _draw_pie(canvas, sorted_data, colors, assets_dir, font_name)
+
+        draw = ImageDraw.Draw(canvas)
+        _draw_time_capsule(draw, time_range_str, assets_dir, font_name)
+        # 被合并为“其他”的分类在饼图下方简要列出
+        if folded:
+            _draw_text(
+                draw,
+                _card_point(0.5, 0.165),
+                format_other_legend(folded),
+                get_font(assets_dir, font_name, 16),
+                "#999999",
+            )
+
+        encode_chart(canvas, save_path, output or ChartOutput())
+        logger.info(f"生成{group_id}图表成功！")
+        return True
+
+    except Exception as e:
+        logger.error(f"绘图失败: {e}")
+        import traceback
+
+        logger.error(traceback.format_exc())
+        return False
+
+
+def render_chart_bytes(
+    group_id: str,
+    summary: dict[str, Any],
+    assets_dir: Path,
+    font_name: str = "cute_font.ttf",
+    bg_img_name: str = "bg.png",
+    group_display_name: str = "",
+    output: ChartOutput | None = None,
+    max_categories: int = 0,
+) -> bytes | None:
+    """绘制统计图并直接返回编码后的图片数据，不写入磁盘"""
+    buffer = BytesIO()
+    if not draw_chart(
+        group_id,
+        summary,
+        buffer,
+        assets_dir,
+        font_name,
+        bg_img_name,
+        group_display_name,
+        output,
+        max_categories,
+    ):
+        return None
+    return buffer.getvalue()
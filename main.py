@@ -1,5 +1,6 @@
 import asyncio
 import json
+import os
 import time
 from datetime import datetime
 from pathlib import Path
@@ -11,16 +12,35 @@ from astrbot.api import AstrBotConfig, logger
 from astrbot.api.event import AstrMessageEvent, MessageChain, filter
 from astrbot.api.star import Context, Star, StarTools
 
-from .draw import draw_chart
-
-DEFAULT_GROUP_ID = "default"
-
-MESSAGE_DEFAULTS = {
-    "welcome_msg": "欢迎新成员！通过自动审核",
-    "reject_reason": "检测到关键词%key%，拒绝申请",
-    "decrease_msg": "呜呜呜~ %user_name%(%user_id%)退出了群聊",
-    "increase_msg": "恭喜你通过人工审核，欢迎入群~",
-}
+from .chart_cache import (
+    ChartCache,
+    MemoryChartCache,
+    chart_cache_key,
+    scan_chart_cache,
+)
+from .chart_style import CHART_FORMATS, FIG_DPI, ChartOutput
+from .records import GroupRecords, GroupRollup, as_group_records, period_of
+from .render import CHART_ENGINES, ChartRenderer
+from .rules import (
+    RULE_CONFIG_KEYS,
+    EventSettings,
+    RuleSet,
+)
+from .serializers import BinarySerializer, get_serializer
+from .storage import (
+    JournalRecordStorage,
+    FileRecordStorage,
+    RecordChange,
+    ShardedRecordStorage,
+    SqliteRecordStorage,
+    load_rollups,
+    save_rollups,
+    summarize_records,
+)
+from .templates import TemplateData
+
+# 统计图: file 模式下为图片路径，memory 模式下为编码后的图片数据
+ChartResult = Path | bytes
 
 
 class JoinManager(Star):
@@ -32,224 +52,577 @@ class JoinManager(Star):
         self.plugin_dir = Path(__file__).parent.absolute()
         self.assets_dir = self.plugin_dir / "assets"
         self.data_dir = Path(StarTools.get_data_dir("astrbot_plugin_joinmanager"))
-        self.records_file = self.data_dir / "join_records.json"
+        self.json_records_file = self.data_dir / "join_records.json"
+        self.binary_records_file = self.data_dir / "join_records.bin"
+        self.journal_file = self.data_dir / "join_records.journal"
+        self.db_file = self.data_dir / "join_records.db"
+        self.shard_dir = self.data_dir / "records"
+        self.rollups_file = self.data_dir / "join_rollups.json"
         self.chart_cache_dir = self.data_dir / "chart_cache"
-        self.active_chart_paths: set[Path] = set()
+        # 正在使用的临时图表及其引用数，引用归零后才删除
+        self.active_chart_paths: dict[Path, int] = {}
+        # 已创建、尚未删除的临时图表及其创建时间，由后台清理任务兜底删除
+        self.chart_temp_paths: dict[Path, float] = {}
+        self._chart_janitor_task: asyncio.Task | None = None
+        self.chart_delivery = str(self.config.get("chart_delivery", "memory"))
+        self.chart_output = self._get_chart_output()
+        self.chart_top_n = self._get_chart_top_n()
+        chart_cache_bytes = self._get_chart_cache_bytes()
+        # 两种发送方式各用各的缓存，未使用的一方容量为 0 即关闭
+        self.chart_cache = ChartCache(
+            self.chart_cache_dir / "store",
+            chart_cache_bytes if self.chart_delivery == "file" else 0,
+            self.chart_output.suffix,
+        )
+        self.memory_chart_cache = MemoryChartCache(
+            chart_cache_bytes if self.chart_delivery == "memory" else 0
+        )
+        self.chart_renderer = self._create_chart_renderer()
+        self.chart_coalesce_seconds = self._get_chart_coalesce_seconds()
+        self._chart_renders: dict[str, asyncio.Task] = {}
+        self._chart_pending_renders: dict[str, asyncio.Task] = {}
+        self._recent_charts: dict[str, tuple[ChartResult, asyncio.TimerHandle]] = {}
+        self._renderer_start_task: asyncio.Task | None = None
 
         # 2. 目录检查
         if not self.data_dir.exists():
             self.data_dir.mkdir(parents=True, exist_ok=True)
         if not self.chart_cache_dir.exists():
             self.chart_cache_dir.mkdir(parents=True, exist_ok=True)
+        if self.chart_cache.enabled:
+            self.chart_cache.cache_dir.mkdir(parents=True, exist_ok=True)
         if not self.assets_dir.exists():
             logger.warning(
                 f"[JoinManager] 未找到 assets 目录，自定义字体可能无法加载: {self.assets_dir}"
             )
 
-        # 3. 数据加载
-        self.records = self._load_records()
+        # 3. 数据加载 (在 initialize 或首次使用时于后台线程完成)
+        self.storage = self._create_storage()
+        self.records: dict[str, GroupRecords] = {}
+        self.known_groups: set[str] = set()
+        self.group_last_used: dict[str, float] = {}
+        self._records_ready_task: asyncio.Task | None = None
+        self._records_loaded = False
+        self._group_load_tasks: dict[str, asyncio.Task] = {}
+        self._evict_task: asyncio.Task | None = None
+        self.rollups: dict[str, GroupRollup] = {}
+        self._rollups_dirty = False
+        self._rollup_task: asyncio.Task | None = None
+        self._compaction_task: asyncio.Task | None = None
+        self._load_storage_options()
+        self._pending_changes: list[RecordChange] = []
+        self._flush_wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
 
         # 4. 配置加载
-        self.welcome_config = self._load_message_templates(
-            "welcome_msg", MESSAGE_DEFAULTS["welcome_msg"]
-        )
-        self.decrease_config = self._load_message_templates(
-            "decrease_msg", MESSAGE_DEFAULTS["decrease_msg"]
-        )
-        self.increase_config = self._load_message_templates(
-            "increase_msg", MESSAGE_DEFAULTS["increase_msg"]
-        )
-        self.reject_reason = self._load_message_templates(
-            "reject_reason", MESSAGE_DEFAULTS["reject_reason"]
-        )
-
-        self.accept_rules, self.accept_rule_groups = self._load_accept_rules()
-        self.reject_rules, self.reject_rule_groups = self._load_reject_rules()
+        # 关键词规则、消息模板与等级限制，配置变化时整体替换为新的规则集
+        self.rules = RuleSet(self.config)
+        self.rules_reload_seconds = self._get_rules_reload_seconds()
+        self._rules_config_mtime = self._get_config_mtime()
+        self._rules_watch_task: asyncio.Task | None = None
         self.seen_group_request_flags: set[str] = set()
         self.group_name_cache: dict[str, str] = {}
-        level_limit = self.config.get("level_limit", {})
-        if not isinstance(level_limit, dict):
-            level_limit = {}
-        self.level_limit_enabled = bool(level_limit.get("enabled", False))
+
+    def _get_rules_reload_seconds(self) -> float:
         try:
-            self.min_level = int(level_limit.get("min_level", 0))
+            seconds = float(self.config.get("rules_reload_seconds", 5))
         except (TypeError, ValueError):
-            self.min_level = 0
-        self.reject_low_level = bool(level_limit.get("reject_low_level", False))
-        self.level_limit_reject_reason = str(
-            level_limit.get(
-                "reject_reason",
-                "您的 QQ 等级过低，未通过本群自动审核。",
-            )
-        )
+            seconds = 5
+        return max(seconds, 0)
 
-    @staticmethod
-    def _normalize_group_id(value: Any) -> str:
-        group_id = str(value or "").strip()
-        if (
-            not group_id
-            or group_id == "默认"
-            or group_id.lower() in {DEFAULT_GROUP_ID, "*"}
-        ):
-            return DEFAULT_GROUP_ID
-        return group_id
+    def _get_config_mtime(self) -> float | None:
+        config_path = getattr(self.config, "config_path", None)
+        if not config_path:
+            return None
+        try:
+            return os.stat(config_path).st_mtime
+        except OSError:
+            return None
 
-    @staticmethod
-    def _keywords_from_value(value: Any) -> list[str]:
-        if isinstance(value, str):
-            raw_keywords = value.replace("，", ",").split(",")
-        elif isinstance(value, list):
-            raw_keywords = value
-        else:
+    def _read_rule_config_sync(self) -> dict[str, Any]:
+        with open(self.config.config_path, encoding="utf-8-sig") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            return {}
+        return {key: data[key] for key in RULE_CONFIG_KEYS if key in data}
+
+    def reload_rules(self) -> list[str]:
+        """按当前配置重建规则集，只重新解析发生变化的配置项，返回变化的配置项"""
+        start = time.perf_counter()
+        rules = RuleSet(self.config, self.rules)
+        changed = rules.changed_keys(self.rules)
+        if not changed:
             return []
-        return [
-            str(keyword).strip() for keyword in raw_keywords if str(keyword).strip()
-        ]
+        # 单次赋值替换，进行中的请求继续使用它们取得的旧规则集
+        self.rules = rules
+        logger.info(
+            f"[JoinManager] 规则已热重载: {', '.join(changed)}，"
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return changed
+
+    async def _rules_watch_loop(self):
+        """定期检查配置文件与内存中的配置，规则变化时热重载"""
+        while True:
+            await asyncio.sleep(self.rules_reload_seconds)
+            mtime = self._get_config_mtime()
+            if mtime is not None and mtime != self._rules_config_mtime:
+                self._rules_config_mtime = mtime
+                try:
+                    # 配置文件被直接修改时，先把规则相关的配置项读回内存
+                    self.config.update(
+                        await asyncio.to_thread(self._read_rule_config_sync)
+                    )
+                except Exception as e:
+                    logger.warning(f"[JoinManager] 读取配置文件失败: {e}")
+            try:
+                self.reload_rules()
+            except Exception as e:
+                logger.warning(f"[JoinManager] 热重载规则失败，继续使用原规则: {e}")
+
+    def _get_storage_config(self) -> dict[str, Any]:
+        storage_config = self.config.get("storage", {})
+        if not isinstance(storage_config, dict):
+            storage_config = {}
+        return storage_config
+
+    def _create_storage(self) -> FileRecordStorage:
+        storage_config = self._get_storage_config()
+        serializer = get_serializer(str(storage_config.get("format", "json")))
+        # 快照文件按格式区分，另一种格式的旧文件作为迁移来源
+        if serializer.name == BinarySerializer.name:
+            records_file = self.binary_records_file
+            fallback_files = (self.json_records_file,)
+        else:
+            records_file = self.json_records_file
+            fallback_files = (self.binary_records_file,)
 
-    def _group_ids_from_rule(self, item: dict[str, Any]) -> list[str]:
-        raw_group_ids = item.get("group_ids")
-        if raw_group_ids is None:
-            raw_group_ids = item.get("group_id", DEFAULT_GROUP_ID)
-
-        if not isinstance(raw_group_ids, list):
-            raw_group_ids = [raw_group_ids]
-
-        group_ids: list[str] = []
-        for raw_group_id in raw_group_ids:
-            group_id = self._normalize_group_id(raw_group_id)
-            if group_id not in group_ids:
-                group_ids.append(group_id)
-
-        return group_ids or [DEFAULT_GROUP_ID]
-
-    def _load_message_templates(
-        self, config_key: str, default_text: str
-    ) -> dict[str, str]:
-        raw_list = self.config.get("message_templates", {}).get(config_key, [])
-        result: dict[str, str] = {}
-        for item in raw_list:
-            if not isinstance(item, dict):
-                continue
+        mode = str(storage_config.get("mode", "json")).strip().lower()
+        if mode == "journal":
+            try:
+                compact_kb = int(storage_config.get("journal_compact_kb", 1024))
+            except (TypeError, ValueError):
+                compact_kb = 1024
+            return JournalRecordStorage(
+                records_file,
+                self.journal_file,
+                compact_kb * 1024,
+                serializer,
+                fallback_files,
+            )
+        if mode == "sharded":
+            return ShardedRecordStorage(
+                self.shard_dir, self.json_records_file, serializer
+            )
+        if mode == "sqlite":
+            try:
+                return SqliteRecordStorage(self.db_file, self.json_records_file)
+            except Exception as e:
+                logger.error(f"[JoinManager] 打开 SQLite 数据库失败，回退为 json: {e}")
+        elif mode != "json":
+            logger.warning(f"[JoinManager] 未知的存储模式 {mode}，回退为 json")
+        return FileRecordStorage(records_file, serializer, fallback_files)
+
+    def _create_chart_renderer(self) -> ChartRenderer:
+        render_config = self.config.get("chart_render", {})
+        if not isinstance(render_config, dict):
+            render_config = {}
+        mode = str(render_config.get("mode", "thread"))
+        engine = str(self.config.get("chart_engine", "matplotlib"))
+        if engine not in CHART_ENGINES:
+            logger.warning(f"[JoinManager] 未知的绘图引擎 {engine}，回退为 matplotlib")
+            engine = "matplotlib"
+        try:
+            workers = int(render_config.get("workers", 2))
+        except (TypeError, ValueError):
+            workers = 2
+        try:
+            queue_size = int(render_config.get("queue_size", 8))
+        except (TypeError, ValueError):
+            queue_size = 8
+        return ChartRenderer(
+            mode,
+            engine,
+            workers,
+            queue_size,
+            self.assets_dir,
+            self.config.get("font", "cute_font.ttf"),
+            self.config.get("bg_img", "bg.png"),
+            bool(render_config.get("prewarm", False)),
+        )
 
-            group_ids = self._group_ids_from_rule(item)
-            text = str(item.get("text", ""))
-            if text:
-                for group_id in group_ids:
-                    result[group_id] = text
+    def _load_storage_options(self):
+        storage_config = self._get_storage_config()
+        self.write_behind = bool(storage_config.get("write_behind", False))
+        try:
+            self.flush_interval = float(storage_config.get("flush_interval", 5))
+        except (TypeError, ValueError):
+            self.flush_interval = 5.0
+        self.flush_interval = max(self.flush_interval, 0.1)
+        try:
+            self.flush_threshold = int(storage_config.get("flush_threshold", 100))
+        except (TypeError, ValueError):
+            self.flush_threshold = 100
+        self.flush_threshold = max(self.flush_threshold, 1)
+        try:
+            self.evict_idle_seconds = int(storage_config.get("evict_idle_seconds", 0))
+        except (TypeError, ValueError):
+            self.evict_idle_seconds = 0
+        try:
+            self.retention_days = int(storage_config.get("retention_days", 0))
+        except (TypeError, ValueError):
+            self.retention_days = 0
+        self.rollup_granularity = str(storage_config.get("rollup_granularity", "month"))
+
+    def _load_records(self) -> dict[str, GroupRecords]:
+        """加载统计记录，并转换为紧凑的内存表示"""
+        return {
+            str(group_id): as_group_records(group_records)
+            for group_id, group_records in self.storage.load().items()
+        }
 
-        if DEFAULT_GROUP_ID not in result:
-            result[DEFAULT_GROUP_ID] = default_text
-        return result
+    async def initialize(self):
+        await self._ensure_records_ready()
+        await self._restore_chart_cache()
+        self._chart_janitor_task = asyncio.create_task(self._chart_janitor_loop())
+        if self.rules_reload_seconds > 0:
+            self._rules_watch_task = asyncio.create_task(self._rules_watch_loop())
+        # 绘图引擎导入与渲染进程启动较慢，在后台预热，不阻塞插件加载
+        self._renderer_start_task = asyncio.create_task(self.chart_renderer.start())
+
+    async def _ensure_records_ready(self):
+        """确保记录索引已加载；首次调用时在后台线程中加载"""
+        if self._records_ready_task is None:
+            self._records_ready_task = asyncio.create_task(self._load_records_index())
+        await asyncio.shield(self._records_ready_task)
+
+    async def _load_records_index(self):
+        start = time.perf_counter()
+        try:
+            if self.storage.lazy:
+                # 只读取群索引，群记录在首次用到时再加载
+                group_ids = await asyncio.to_thread(self.storage.load_index)
+                self.known_groups.update(group_ids)
+            else:
+                self.records.update(await asyncio.to_thread(self._load_records))
+                self.known_groups.update(self.records)
+            rollups = await asyncio.to_thread(load_rollups, self.rollups_file)
+            self.rollups.update(
+                (str(group_id), GroupRollup.from_dict(data))
+                for group_id, data in rollups.items()
+                if isinstance(data, dict)
+            )
+        except Exception as e:
+            logger.error(
+                f"加载入群记录失败: {e}，本次运行不会写入入群记录，"
+                "以免覆盖磁盘上的数据；请检查数据文件后重载插件"
+            )
+            return
+        self._records_loaded = True
+        logger.info(
+            f"[JoinManager] 入群记录索引加载完成: {len(self.known_groups)} 个群，"
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        if self.storage.lazy and self.evict_idle_seconds > 0:
+            self._evict_task = asyncio.create_task(self._evict_loop())
+        if self.retention_days > 0:
+            self._rollup_task = asyncio.create_task(self._rollup_loop())
 
-    def _load_accept_rules(self) -> tuple[dict[str, dict[str, list[str]]], set[str]]:
-        raw_rules = self.config.get("accept_rules", [])
-        rules: dict[str, dict[str, list[str]]] = {}
-        configured_groups: set[str] = set()
+    def _has_group(self, group_id: str) -> bool:
+        return (
+            group_id in self.records
+            or group_id in self.known_groups
+            or group_id in self.rollups
+        )
 
-        for item in raw_rules:
-            if not isinstance(item, dict):
-                continue
+    async def _ensure_group_loaded(self, group_id: str) -> GroupRecords | None:
+        """返回群记录，未加载的群按需从存储中读取；群不存在时返回 None"""
+        await self._ensure_records_ready()
+        self.group_last_used[group_id] = time.monotonic()
+        group_records = self.records.get(group_id)
+        if group_records is not None or group_id not in self.known_groups:
+            return group_records
+        if not self.storage.lazy:
+            # 单文件存储启动时已整体加载，不能按群读取
+            return None
 
-            group_ids = self._group_ids_from_rule(item)
-            configured_groups.update(group_ids)
-            if not item.get("enabled", True):
-                continue
+        # 同一个群的并发请求共用一次加载
+        load_task = self._group_load_tasks.get(group_id)
+        if load_task is None:
+            load_task = asyncio.create_task(
+                asyncio.to_thread(self._load_group_sync, group_id)
+            )
+            self._group_load_tasks[group_id] = load_task
+        try:
+            loaded = await asyncio.shield(load_task)
+        finally:
+            if load_task.done():
+                self._group_load_tasks.pop(group_id, None)
 
-            category = str(item.get("category", "")).strip()
-            keywords = self._keywords_from_value(item.get("keywords", []))
-            if not category or not keywords:
-                continue
+        # 等待期间可能已有其他协程放入了记录
+        group_records = self.records.get(group_id)
+        if group_records is None:
+            group_records = self.records[group_id] = loaded
+            logger.debug(
+                f"[JoinManager] 已按需加载群 {group_id} 的入群记录: {len(loaded)} 条"
+            )
+            await self._rollup_groups([group_id])
+        return group_records
+
+    def _load_group_sync(self, group_id: str) -> GroupRecords:
+        return as_group_records(self.storage.load_group(group_id))
+
+    async def _rollup_loop(self):
+        """定期把超过保留期的明细记录汇总为按时间段的分类人数"""
+        while True:
+            await self._rollup_groups(list(self.records))
+            await asyncio.sleep(3600)
+
+    async def _rollup_groups(self, group_ids: list[str]):
+        """汇总多个群的过期记录，全部群的删除与汇总表合并为一次写入"""
+        changes: list[RecordChange] = []
+        for group_id in group_ids:
+            changes.extend(self._rollup_group(group_id))
+        if not changes:
+            return
+        if self.write_behind or not self._records_loaded:
+            self._persist_changes(changes)
+            return
+        # 与延迟合并写入相同，在后台线程中写入明细删除与汇总表
+        self._pending_changes.extend(changes)
+        await self._flush_records()
 
-            for group_id in group_ids:
-                category_rules = rules.setdefault(group_id, {})
-                category_keywords = category_rules.setdefault(category, [])
-                for keyword in keywords:
-                    if keyword not in category_keywords:
-                        category_keywords.append(keyword)
+    def _rollup_group(self, group_id: str) -> list[RecordChange]:
+        """把该群超过保留期的记录计入汇总，返回需要写入的删除变更"""
+        if self.retention_days <= 0:
+            return []
+        group_records = self.records.get(group_id)
+        if group_records is None:
+            return []
 
-        return rules, configured_groups
+        cutoff = int(time.time()) - self.retention_days * 86400
+        expired = group_records.pop_older_than(cutoff)
+        if not expired:
+            return []
 
-    def _load_reject_rules(self) -> tuple[dict[str, list[str]], set[str]]:
-        raw_rules = self.config.get("reject_rules", [])
-        rules: dict[str, list[str]] = {}
-        configured_groups: set[str] = set()
+        rollup = self.rollups.get(group_id)
+        if rollup is None:
+            rollup = self.rollups[group_id] = GroupRollup()
+        for _, timestamp, category in expired:
+            rollup.add(period_of(timestamp, self.rollup_granularity), category)
+        self._rollups_dirty = True
+        logger.info(
+            f"[JoinManager] 群 {group_id} 已将 {len(expired)} 条超过"
+            f" {self.retention_days} 天的入群记录汇总"
+        )
+        return [("remove", group_id, user_id, None) for user_id, _, _ in expired]
 
-        for item in raw_rules:
-            if not isinstance(item, dict):
-                continue
+    def _rollup_snapshot(self) -> dict:
+        return {
+            group_id: rollup.to_dict() for group_id, rollup in self.rollups.items()
+        }
 
-            group_ids = self._group_ids_from_rule(item)
-            configured_groups.update(group_ids)
-            if not item.get("enabled", True):
+    async def _evict_loop(self):
+        interval = min(max(self.evict_idle_seconds / 2, 1), 60)
+        while True:
+            await asyncio.sleep(interval)
+            self._evict_idle_groups()
+
+    def _evict_idle_groups(self):
+        """淘汰长时间未使用、且没有待写入数据的群"""
+        expires_before = time.monotonic() - self.evict_idle_seconds
+        pending_groups = {change[1] for change in self._pending_changes}
+        evicted = 0
+        for group_id in list(self.records):
+            if self.group_last_used.get(group_id, 0) > expires_before:
                 continue
-
-            keywords = self._keywords_from_value(item.get("keywords", []))
-            for group_id in group_ids:
-                group_keywords = rules.setdefault(group_id, [])
-                for keyword in keywords:
-                    if keyword not in group_keywords:
-                        group_keywords.append(keyword)
-
-        return rules, configured_groups
-
-    def get_accept_rules(self, group_id: str) -> dict[str, list[str]]:
-        group_id = self._normalize_group_id(group_id)
-        if group_id in self.accept_rule_groups:
-            return self.accept_rules.get(group_id, {})
-        return self.accept_rules.get(DEFAULT_GROUP_ID, {})
-
-    def get_reject_keywords(self, group_id: str) -> list[str]:
-        group_id = self._normalize_group_id(group_id)
-        if group_id in self.reject_rule_groups:
-            return self.reject_rules.get(group_id, [])
-        return self.reject_rules.get(DEFAULT_GROUP_ID, [])
-
-    def _load_records(self) -> dict:
-        """加载 JSON 统计记录"""
-        if self.records_file.exists():
-            try:
-                with self.records_file.open("r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"加载入群记录失败: {e}")
-        return {}
+            if group_id in pending_groups or self.storage.has_unsaved(group_id):
+                continue
+            self.records.pop(group_id, None)
+            self.group_last_used.pop(group_id, None)
+            evicted += 1
+        if evicted:
+            logger.debug(f"[JoinManager] 已从内存中淘汰 {evicted} 个空闲群的入群记录")
 
     def get_notice_session(
         self,
         event: AstrMessageEvent,
         type: str,  # reject_notice / accept_notice / decrease_notice / increase_notice
-    ) -> set[str]:
+        settings: EventSettings | None = None,
+    ) -> frozenset[str]:
         """获取需要通知的会话ID"""
-        umo = event.unified_msg_origin
-        sessions = self.config.get("notice", {}).get(type, [])
-        filtered_sessions = {item for item in sessions if item != "origin"}
-        if "origin" in sessions:
-            filtered_sessions.add(umo)
-        return filtered_sessions
+        settings = settings or self.rules.settings
+        return settings.notice_sessions(type, event.unified_msg_origin)
 
     def _save_records(self):
-        """保存 JSON 统计记录"""
+        """保存完整统计记录"""
+        if not self._records_loaded:
+            # 记录尚未加载完成时保存会用空数据覆盖磁盘
+            return
         try:
-            with self.records_file.open("w", encoding="utf-8") as f:
-                json.dump(self.records, f, ensure_ascii=False, indent=2)
+            self.storage.save(self.records)
         except Exception as e:
             logger.error(f"保存入群记录失败: {e}")
 
+    async def _add_record(
+        self, group_id: str, user_id: str, record: dict[str, str]
+    ):
+        group_records = await self._ensure_group_loaded(group_id)
+        if group_records is None:
+            group_records = self.records[group_id] = GroupRecords()
+            self.known_groups.add(group_id)
+        group_records.set(user_id, record)
+        self._persist_changes([("insert", group_id, user_id, record)])
+
+    async def _remove_record(self, group_id: str, user_id: str) -> bool:
+        group_records = await self._ensure_group_loaded(group_id)
+        if group_records is None or user_id not in group_records:
+            return False
+        group_records.pop(user_id)
+        self._persist_changes([("remove", group_id, user_id, None)])
+        return True
+
+    def _persist_changes(self, changes: list[RecordChange]):
+        if not self._records_loaded:
+            # 加载失败时内存中只有部分记录，写入或合并都会覆盖磁盘上的数据
+            logger.warning(
+                f"[JoinManager] 入群记录未成功加载，跳过写入 {len(changes)} 条变更"
+            )
+            return
+        if self.write_behind:
+            # 只记下变更，由后台任务合并后统一写入
+            self._pending_changes.extend(changes)
+            self._ensure_flush_task()
+            if len(self._pending_changes) >= self.flush_threshold:
+                self._flush_wakeup.set()
+            return
+
+        try:
+            self.storage.apply(self.records, changes)
+        except Exception as e:
+            logger.error(f"保存入群记录失败: {e}")
+        # 汇总表在明细删除写入之后保存，中断时宁可少计也不重复计数
+        if self._rollups_dirty:
+            self._rollups_dirty = False
+            try:
+                save_rollups(self.rollups_file, self._rollup_snapshot())
+            except Exception as e:
+                self._rollups_dirty = True
+                logger.error(f"保存入群汇总统计失败: {e}")
+        self._schedule_compaction()
+
+    def _ensure_flush_task(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """按间隔或脏变更数量阈值，把积累的变更合并写入存储"""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_wakeup.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            await self._flush_records()
+
+    async def _flush_records(self):
+        async with self._flush_lock:
+            if not self._pending_changes and not self._rollups_dirty:
+                return
+
+            changes, self._pending_changes = self._pending_changes, []
+            snapshot = self.storage.snapshot(self.records, changes)
+            rollups_snapshot = None
+            if self._rollups_dirty:
+                rollups_snapshot = self._rollup_snapshot()
+                self._rollups_dirty = False
+            try:
+                if changes:
+                    await asyncio.to_thread(self.storage.apply, snapshot, changes)
+                    logger.debug(
+                        f"[JoinManager] 已合并写入 {len(changes)} 条入群记录变更"
+                    )
+            except Exception as e:
+                logger.error(f"保存入群记录失败: {e}")
+                # 放回队首，下次写入时重试
+                self._pending_changes[:0] = changes
+                if rollups_snapshot is not None:
+                    self._rollups_dirty = True
+                return
+            if rollups_snapshot is not None:
+                try:
+                    await asyncio.to_thread(
+                        save_rollups, self.rollups_file, rollups_snapshot
+                    )
+                except Exception as e:
+                    self._rollups_dirty = True
+                    logger.error(f"保存入群汇总统计失败: {e}")
+            self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        """日志超过阈值时在后台合并为快照"""
+        if not self._records_loaded:
+            return
+        if self._compaction_task and not self._compaction_task.done():
+            return
+        if not self.storage.needs_compaction():
+            return
+
+        try:
+            self.storage.begin_compaction()
+        except Exception as e:
+            logger.error(f"[JoinManager] 轮转入群记录日志失败: {e}")
+            return
+        snapshot = {
+            group_id: group_records.copy()
+            for group_id, group_records in self.records.items()
+        }
+        self._compaction_task = asyncio.create_task(self._compact_records(snapshot))
+
+    async def _compact_records(self, snapshot: dict):
+        try:
+            await asyncio.to_thread(self.storage.compact, snapshot)
+            logger.debug("[JoinManager] 入群记录日志合并完成")
+        except Exception as e:
+            logger.error(f"[JoinManager] 合并入群记录日志失败: {e}")
+
     async def terminate(self):
+        for task in (
+            self._evict_task,
+            self._rollup_task,
+            self._renderer_start_task,
+            self._chart_janitor_task,
+            self._rules_watch_task,
+        ):
+            if task and not task.done():
+                task.cancel()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        # 最后一次写入，确保积压的变更全部落盘
+        await self._flush_records()
+        if self._compaction_task and not self._compaction_task.done():
+            await self._compaction_task
         self._save_records()
+        try:
+            self.storage.close()
+        except Exception as e:
+            logger.warning(f"[JoinManager] 关闭存储失败: {e}")
+        for chart, handle in self._recent_charts.values():
+            handle.cancel()
+            await self._dispose_chart(chart)
+        self._recent_charts.clear()
+        self.chart_renderer.close()
 
     def _check_permission(self, group_id: str) -> bool:
         """检查会话权限"""
-        divide_group = self.config.get("divide_group", {})
-        block_method = divide_group.get("block_method", "blacklist")
-        control_list = divide_group.get("control_list", [])
-
-        control_list_str = [str(i) for i in control_list]
-
-        if block_method == "whitelist":
-            return group_id in control_list_str
-        else:
-            return group_id not in control_list_str
+        return self.rules.settings.allows_group(group_id)
 
     def _get_chart_cleanup_seconds(self) -> int:
         try:
@@ -258,6 +631,77 @@ class JoinManager(Star):
             seconds = 600
         return max(seconds, 1)
 
+    def _get_chart_coalesce_seconds(self) -> float:
+        try:
+            seconds = float(self.config.get("chart_coalesce_seconds", 5))
+        except (TypeError, ValueError):
+            seconds = 5.0
+        return max(seconds, 0.0)
+
+    def _get_chart_output(self) -> ChartOutput:
+        output_config = self.config.get("chart_output", {})
+        if not isinstance(output_config, dict):
+            output_config = {}
+        output_format = str(output_config.get("format", "png")).lower()
+        if output_format == "jpg":
+            output_format = "jpeg"
+        if output_format not in CHART_FORMATS:
+            logger.warning(f"[JoinManager] 未知的图片格式 {output_format}，回退为 png")
+            output_format = "png"
+        try:
+            quality = int(output_config.get("quality", 85))
+        except (TypeError, ValueError):
+            quality = 85
+        try:
+            dpi = int(output_config.get("dpi", FIG_DPI))
+        except (TypeError, ValueError):
+            dpi = FIG_DPI
+        # 绘图按 FIG_DPI 进行，只缩小不放大
+        return ChartOutput(
+            output_format, min(max(quality, 1), 100), min(max(dpi, 30), FIG_DPI)
+        )
+
+    def _get_chart_top_n(self) -> int:
+        try:
+            top_n = int(self.config.get("chart_top_n", 0))
+        except (TypeError, ValueError):
+            top_n = 0
+        return max(top_n, 0)
+
+    def _get_chart_cache_bytes(self) -> int:
+        try:
+            megabytes = float(self.config.get("chart_cache_mb", 32))
+        except (TypeError, ValueError):
+            megabytes = 32
+        return max(int(megabytes * 1024 * 1024), 0)
+
+    async def _restore_chart_cache(self):
+        """载入上次运行留下的统计图缓存"""
+        if not self.chart_cache.enabled:
+            return
+        try:
+            entries = await asyncio.to_thread(
+                scan_chart_cache, self.chart_cache.cache_dir
+            )
+        except Exception as e:
+            logger.warning(f"[JoinManager] 读取统计图缓存失败: {e}")
+            return
+        removed = self.chart_cache.restore(entries)
+        if removed:
+            await asyncio.to_thread(self._delete_cached_charts_sync, removed)
+
+    @staticmethod
+    def _delete_cached_charts_sync(paths: list[Path]):
+        for path in paths:
+            try:
+                path.unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning(f"[JoinManager] 删除统计图缓存失败: {path} | {e}")
+
+    def _store_cached_chart_sync(self, chart_path: Path, cached_path: Path) -> int:
+        os.replace(chart_path, cached_path)
+        return cached_path.stat().st_size
+
     def _build_chart_cache_path(self, group_id: str) -> Path:
         safe_group_id = (
             "".join(char for char in group_id if char.isdigit()) or "unknown"
@@ -265,90 +709,359 @@ class JoinManager(Star):
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
         return (
             self.chart_cache_dir
-            / f"joinmanager_{safe_group_id}_{timestamp}_{uuid4().hex[:8]}.png"
+            / f"joinmanager_{safe_group_id}_{timestamp}_{uuid4().hex[:8]}"
+            f"{self.chart_output.suffix}"
         )
 
-    def _cleanup_chart_cache_sync(self, active_paths: set[Path]):
-        cleanup_seconds = self._get_chart_cleanup_seconds()
+    def _scan_chart_leftovers_sync(self, expires_before: float) -> dict[Path, float]:
+        """启动时扫描上次运行残留的临时图表
+
+        删除已过期的图表，返回未过期的图表及其修改时间，交给后台清理任务。
+        """
+        leftovers: dict[Path, float] = {}
         if not self.chart_cache_dir.exists():
-            return
+            return leftovers
 
-        expires_before = time.time() - cleanup_seconds
-        for chart_path in self.chart_cache_dir.glob("joinmanager_*.png*"):
+        for chart_path in self.chart_cache_dir.glob("joinmanager_*"):
             try:
-                if chart_path in active_paths:
+                if not chart_path.is_file():
                     continue
-                if chart_path.is_file() and chart_path.stat().st_mtime < expires_before:
-                    if chart_path.suffix == ".deleting":
-                        chart_path.unlink()
-                    else:
-                        deleting_path = chart_path.with_suffix(
-                            f"{chart_path.suffix}.deleting"
-                        )
-                        chart_path.rename(deleting_path)
-                        deleting_path.unlink()
+                mtime = chart_path.stat().st_mtime
+                if chart_path.suffix == ".deleting":
+                    chart_path.unlink()
+                elif mtime < expires_before:
+                    deleting_path = chart_path.with_suffix(
+                        f"{chart_path.suffix}.deleting"
+                    )
+                    chart_path.rename(deleting_path)
+                    deleting_path.unlink()
+                else:
+                    leftovers[chart_path] = mtime
             except FileNotFoundError:
                 continue
             except Exception as e:
                 logger.warning(f"[JoinManager] 清理图表缓存失败: {chart_path} | {e}")
+        return leftovers
 
-    async def _cleanup_chart_cache(self):
-        active_paths = set(self.active_chart_paths)
-        await asyncio.to_thread(self._cleanup_chart_cache_sync, active_paths)
+    async def _chart_janitor_loop(self):
+        """兜底清理发送中断或删除失败而残留的临时图表
 
-    def _release_chart_path(self, chart_path: Path | None):
-        if chart_path:
-            self.active_chart_paths.discard(chart_path)
+        只在启动时扫描一次目录，之后按 chart_temp_paths 中登记的创建时间清理。
+        """
+        cleanup_seconds = self._get_chart_cleanup_seconds()
+        try:
+            leftovers = await asyncio.to_thread(
+                self._scan_chart_leftovers_sync, time.time() - cleanup_seconds
+            )
+        except Exception as e:
+            logger.warning(f"[JoinManager] 扫描图表缓存目录失败: {e}")
+        else:
+            for chart_path, mtime in leftovers.items():
+                self.chart_temp_paths.setdefault(chart_path, mtime)
+
+        while True:
+            await asyncio.sleep(max(cleanup_seconds / 2, 1))
+            await self._sweep_chart_temp_paths(time.time() - cleanup_seconds)
+
+    async def _sweep_chart_temp_paths(self, expires_before: float):
+        expired = [
+            chart_path
+            for chart_path, created in self.chart_temp_paths.items()
+            if created < expires_before and chart_path not in self.active_chart_paths
+        ]
+        if not expired:
+            return
+        deleted = await asyncio.to_thread(self._delete_chart_paths_sync, expired)
+        # 删除失败的图表保持登记，下次清理时重试
+        for chart_path in deleted:
+            self.chart_temp_paths.pop(chart_path, None)
 
-    def _delete_chart_path_sync(self, chart_path: Path):
+    def _delete_chart_paths_sync(self, chart_paths: list[Path]) -> list[Path]:
+        """返回已删除 (或本就不存在) 的图表"""
+        return [
+            chart_path
+            for chart_path in chart_paths
+            if self._delete_chart_path_sync(chart_path)
+        ]
+
+    def _retain_chart(self, chart: ChartResult):
+        """共享图表时增加引用，每个引用都需要对应一次 _dispose_chart"""
+        if isinstance(chart, bytes):
+            return
+        if self.chart_cache.owns(chart):
+            self.chart_cache.retain(chart)
+        else:
+            self.active_chart_paths[chart] = self.active_chart_paths.get(chart, 0) + 1
+
+    def _release_chart_path(self, chart_path: Path | None) -> bool:
+        """释放一个引用，返回图表是否已无人使用"""
+        if chart_path:
+            count = self.active_chart_paths.get(chart_path, 0) - 1
+            if count > 0:
+                self.active_chart_paths[chart_path] = count
+                return False
+            self.active_chart_paths.pop(chart_path, None)
+        return True
+
+    def _delete_chart_path_sync(self, chart_path: Path) -> bool:
+        """删除临时图表，失败时返回 False"""
         try:
             if chart_path.parent != self.chart_cache_dir:
-                return
+                return True
             if chart_path.is_file():
                 deleting_path = chart_path.with_suffix(f"{chart_path.suffix}.deleting")
                 chart_path.rename(deleting_path)
                 deleting_path.unlink()
         except FileNotFoundError:
-            return
+            return True
         except Exception as e:
             logger.warning(f"[JoinManager] 删除图表缓存失败: {chart_path} | {e}")
+            return False
+        return True
 
-    async def _dispose_chart_path(self, chart_path: Path | None):
-        if not chart_path:
+    async def _dispose_chart(self, chart: ChartResult | None):
+        # 内存中的图表无需清理
+        if not chart or isinstance(chart, bytes):
             return
 
-        self._release_chart_path(chart_path)
-        await asyncio.to_thread(self._delete_chart_path_sync, chart_path)
+        chart_path = chart
+        if self.chart_cache.owns(chart_path):
+            # 缓存图片只释放引用，已被淘汰且无人使用时才删除
+            removed = self.chart_cache.release(chart_path)
+            if removed:
+                await asyncio.to_thread(self._delete_cached_charts_sync, [removed])
+            return
+
+        if self._release_chart_path(chart_path):
+            # 删除成功后才取消登记，删除失败的图表由后台任务兜底清理
+            if await asyncio.to_thread(self._delete_chart_path_sync, chart_path):
+                self.chart_temp_paths.pop(chart_path, None)
+
+    async def _get_group_summary(self, group_id: str) -> dict[str, Any]:
+        """获取群的分类人数与时间范围
 
-    async def _generate_chart(self, group_id: str, group_name: str = "") -> Path | None:
-        """异步绘图包装器"""
-        if group_id not in self.records:
+        已加载的群直接使用增量维护的统计；未加载的群优先由存储端聚合，
+        存储不支持时再按需加载该群。超过保留期的汇总数据一并计入。
+        """
+        summary = await self._get_records_summary(group_id)
+        rollup = self.rollups.get(group_id)
+        if rollup is not None:
+            summary = rollup.merge_into(summary)
+        return summary
+
+    async def _get_records_summary(self, group_id: str) -> dict[str, Any]:
+        group_records = self.records.get(group_id)
+        if group_records is None and self.retention_days <= 0:
+            # 开启保留期时需要加载明细以便汇总过期记录，不走存储端聚合
+            try:
+                summary = await asyncio.to_thread(
+                    self.storage.group_summary, group_id
+                )
+            except Exception as e:
+                logger.warning(f"[JoinManager] 存储聚合查询失败，改用内存统计: {e}")
+                summary = None
+            if summary is not None:
+                return summary
+        if group_records is None:
+            group_records = await self._ensure_group_loaded(group_id)
+
+        if group_records is None:
+            return summarize_records({})
+        if group_records.stats is not None:
+            return group_records.stats.summary()
+        return summarize_records(group_records)
+
+    async def _generate_chart(
+        self, group_id: str, group_name: str = ""
+    ) -> ChartResult | None:
+        """异步绘图包装器
+
+        同一个群的绘图请求会合并：刚生成过的图在合并窗口内直接复用；
+        已有绘图进行中时，后来的请求共用它之后的一次绘图，拿到最新的数据。
+        返回的图表都持有一个引用，用完后需调用 _dispose_chart。
+        """
+        if not self._has_group(group_id):
             return None
+        if self.chart_coalesce_seconds <= 0:
+            return await self._render_chart(group_id, group_name)
+
+        recent = self._recent_charts.get(group_id)
+        if recent is not None:
+            self._retain_chart(recent[0])
+            return recent[0]
+
+        render_task = self._chart_pending_renders.get(group_id)
+        if render_task is None:
+            previous_task = self._chart_renders.get(group_id)
+            render_task = asyncio.create_task(
+                self._coalesced_render(group_id, group_name, previous_task)
+            )
+            if previous_task is not None:
+                # 排在进行中的绘图之后，期间到达的请求都共用这一次
+                self._chart_pending_renders[group_id] = render_task
+            else:
+                self._chart_renders[group_id] = render_task
+
+        chart = await asyncio.shield(render_task)
+        if chart is not None:
+            self._retain_chart(chart)
+        return chart
+
+    async def _coalesced_render(
+        self, group_id: str, group_name: str, previous_task: asyncio.Task | None
+    ) -> ChartResult | None:
+        current_task = asyncio.current_task()
+        if previous_task is not None:
+            await asyncio.wait([previous_task])
+            if self._chart_pending_renders.get(group_id) is current_task:
+                del self._chart_pending_renders[group_id]
+            self._chart_renders[group_id] = current_task  # type: ignore
 
-        await self._cleanup_chart_cache()
+        try:
+            chart = await self._render_chart(group_id, group_name)
+        finally:
+            if self._chart_renders.get(group_id) is current_task:
+                del self._chart_renders[group_id]
+        if chart is not None:
+            # 绘图自身持有的引用保留到合并窗口结束，供窗口内的请求复用
+            self._expire_recent_chart(group_id)
+            handle = asyncio.get_running_loop().call_later(
+                self.chart_coalesce_seconds, self._expire_recent_chart, group_id
+            )
+            self._recent_charts[group_id] = (chart, handle)
+        return chart
 
-        group_data = dict(self.records[group_id])
+    def _expire_recent_chart(self, group_id: str):
+        recent = self._recent_charts.pop(group_id, None)
+        if recent is None:
+            return
+        chart, handle = recent
+        handle.cancel()
+        asyncio.create_task(self._dispose_chart(chart))
+
+    async def _render_chart(
+        self, group_id: str, group_name: str
+    ) -> ChartResult | None:
+        summary = await self._get_group_summary(group_id)
         font_name = self.config.get("font", "cute_font.ttf")
         bg_img = self.config.get("bg_img", "bg.png")
+        group_display_name = group_name or group_id
+        render_args = (
+            group_id,
+            summary,
+            font_name,
+            bg_img,
+            group_display_name,
+        )
+
+        cache_key = None
+        if self.chart_cache.enabled or self.memory_chart_cache.enabled:
+            cache_key = chart_cache_key(
+                group_id,
+                summary,
+                group_display_name,
+                self.assets_dir,
+                font_name,
+                bg_img,
+                self.chart_renderer.engine,
+                self.chart_output,
+                self.chart_top_n,
+            )
+        if self.chart_delivery == "memory":
+            return await self._render_chart_bytes(cache_key, *render_args)
+        return await self._render_chart_file(cache_key, *render_args)
+
+    async def _render_chart_bytes(
+        self,
+        cache_key: str | None,
+        group_id: str,
+        summary: dict[str, Any],
+        font_name: str,
+        bg_img: str,
+        group_display_name: str,
+    ) -> bytes | None:
+        """在内存中绘图，不经过 chart_cache_dir"""
+        if cache_key is not None:
+            data = self.memory_chart_cache.get(cache_key)
+            if data is not None:
+                logger.debug(f"[JoinManager] 群 {group_id} 统计未变化，使用缓存图表")
+                return data
+
+        data = await self.chart_renderer.render_bytes(
+            group_id,
+            summary,
+            self.assets_dir,
+            font_name,
+            bg_img,
+            group_display_name,
+            self.chart_output,
+            self.chart_top_n,
+        )
+        if data is not None and cache_key is not None:
+            self.memory_chart_cache.put(cache_key, data)
+        return data
+
+    async def _render_chart_file(
+        self,
+        cache_key: str | None,
+        group_id: str,
+        summary: dict[str, Any],
+        font_name: str,
+        bg_img: str,
+        group_display_name: str,
+    ) -> Path | None:
+        if cache_key is not None:
+            cached_path = self.chart_cache.acquire(cache_key)
+            if cached_path is not None:
+                logger.debug(f"[JoinManager] 群 {group_id} 统计未变化，使用缓存图表")
+                return cached_path
+
         chart_path = self._build_chart_cache_path(group_id)
-        self.active_chart_paths.add(chart_path)
+        self.active_chart_paths[chart_path] = 1
+        self.chart_temp_paths[chart_path] = time.time()
         try:
-            success = await asyncio.to_thread(
-                draw_chart,
+            success = await self.chart_renderer.render(
                 group_id,
-                group_data,
+                summary,
                 chart_path,
                 self.assets_dir,
                 font_name,
                 bg_img,
-                group_name or group_id,
+                group_display_name,
+                self.chart_output,
+                self.chart_top_n,
             )
         except Exception:
-            await self._dispose_chart_path(chart_path)
+            await self._dispose_chart(chart_path)
             raise
-        if success:
+        if not success:
+            await self._dispose_chart(chart_path)
+            return None
+        if cache_key is None:
             return chart_path
-        await self._dispose_chart_path(chart_path)
+
+        cached_path = self.chart_cache.path_for(cache_key)
+        try:
+            size = await asyncio.to_thread(
+                self._store_cached_chart_sync, chart_path, cached_path
+            )
+        except Exception as e:
+            logger.warning(f"[JoinManager] 写入统计图缓存失败: {e}")
+            return chart_path
+        self._release_chart_path(chart_path)
+        self.chart_temp_paths.pop(chart_path, None)
+        cached_path, removed = self.chart_cache.put(cache_key, size)
+        if removed:
+            await asyncio.to_thread(self._delete_cached_charts_sync, removed)
+        return cached_path
+
+    @staticmethod
+    def _chart_component(chart: ChartResult | None) -> Comp.Image | None:
+        """把统计图转换为消息图片，图表不存在时返回 None"""
+        if isinstance(chart, bytes):
+            return Comp.Image.fromBytes(chart)
+        if chart and chart.exists():
+            return Comp.Image.fromFileSystem(str(chart))
         return None
 
     async def _get_stranger_info(
@@ -452,7 +1165,7 @@ class JoinManager(Star):
                 logger.debug(
                     f"[JoinManager] 成功获取用户等级: user_id={user_id}, level={level}"
                 )
-            elif self.level_limit_enabled:
+            elif self.rules.level_limit.enabled:
                 logger.warning(
                     f"[JoinManager] get_stranger_info未返回等级字段，用户 {user_id}"
                 )
@@ -561,97 +1274,61 @@ class JoinManager(Star):
         logger.debug(f"[JoinManager] 未获取到群名称，使用群号兜底: {group_id}")
         return group_id
 
-    async def _get_user_nickname(self, event: AstrMessageEvent, user_id: str) -> str:
-        """Get user nickname.
-
-        Args:
-            event: Current AstrBot message event.
-            user_id: QQ user ID to query.
-
-        Returns:
-            User nickname when available, otherwise an empty string.
-        """
-        info = await self._get_stranger_info(event, user_id)
+    def _stranger_values(self, user_id: str, info: dict[str, Any]) -> dict[str, str]:
+        """用户资料中供模板使用的昵称与等级，获取不到昵称时使用 QQ 号"""
         nick = info.get("nickname") or info.get("nick")
-        return str(nick) if nick else ""
+        if nick:
+            logger.info(f"[JoinManager] 成功获取昵称: {nick} ({user_id})")
+        else:
+            logger.debug(f"[JoinManager] 未获取到用户昵称: {user_id}")
+        return {
+            "user_name": str(nick) if nick else user_id,
+            "user_level": str(info.get("level", "")),
+        }
 
     # ------------------ 占位符处理逻辑 ------------------
 
-    def _format_placeholder(
-        self,
-        text: str,
-        group_id: str,
-        user_id: str,
-        user_name: str = "",
-        group_name: str = "",
-        extra: dict[str, str] | None = None,
-    ) -> str:
-        """
-        统一的占位符替换方法
-        支持: %group_id%, %user_id%, %user_name%
-        extra: 额外的替换键值对，如 {"%key%": "keyword"}
+    def _template_data(
+        self, event: AstrMessageEvent, group_id: str, user_id: str, **values: str
+    ) -> TemplateData:
+        """构造一次事件的占位符数据
+
+        群名称、群人数与用户资料只有在模板用到对应占位符时才调用接口获取。
         """
-        if not text:
-            return ""
-
-        mapping = {
-            r"%group_id%": str(group_id),
-            r"%group_name%": str(group_name or group_id),
-            r"%user_id%": str(user_id),
-            r"%user_name%": str(user_name),
-        }
 
-        if extra:
-            mapping.update(extra)
+        async def load_group_name() -> dict[str, str]:
+            return {"group_name": await self._get_group_name(event, group_id)}
 
-        for k, v in mapping.items():
-            text = text.replace(k, str(v))
-        return text
+        async def load_group_info() -> dict[str, str]:
+            info = await self._get_group_info(event, group_id)
+            return {
+                "member_count": str(info.get("member_count", "")),
+                "max_member_count": str(info.get("max_member_count", "")),
+            }
+
+        async def load_stranger_info() -> dict[str, str]:
+            info = await self._get_stranger_info(event, user_id)
+            return self._stranger_values(user_id, info)
+
+        return TemplateData(
+            {"group_id": group_id, "user_id": user_id, **values},
+            {
+                "group_name": load_group_name,
+                "group_info": load_group_info,
+                "stranger_info": load_stranger_info,
+            },
+        )
 
     def get_welcome_msg(self, group_id: str) -> str:
         """获取原始欢迎语模版"""
-        group_id = self._normalize_group_id(group_id)
-        default = self.welcome_config.get(
-            DEFAULT_GROUP_ID, MESSAGE_DEFAULTS["welcome_msg"]
-        )
-        return self.welcome_config.get(group_id, default)
+        return self.rules.get_template("welcome_msg", group_id).text
 
     def get_decrease_msg(self, group_id: str) -> str:
         """获取原始退群语模版"""
-        group_id = self._normalize_group_id(group_id)
-        default = self.decrease_config.get(
-            DEFAULT_GROUP_ID, MESSAGE_DEFAULTS["decrease_msg"]
-        )
-        return self.decrease_config.get(group_id, default)
+        return self.rules.get_template("decrease_msg", group_id).text
 
     def get_increase_msg(self, group_id: str) -> str:
-        group_id = self._normalize_group_id(group_id)
-        default = self.increase_config.get(
-            DEFAULT_GROUP_ID, MESSAGE_DEFAULTS["increase_msg"]
-        )
-        return self.increase_config.get(group_id, default)
-
-    def get_reject_reason(
-        self, event: AstrMessageEvent, matched_key: str, group_name: str = ""
-    ) -> str:
-        group_id = self._normalize_group_id(event.get_group_id())
-        user_id = event.get_sender_id()
-        user_name = event.get_sender_name()
-
-        reason_tmpl = self.reject_reason.get(
-            group_id,
-            self.reject_reason.get(DEFAULT_GROUP_ID, MESSAGE_DEFAULTS["reject_reason"]),
-        )
-
-        # 占位符
-        return self._format_placeholder(
-            reason_tmpl,
-            group_id,
-            user_id,
-            user_name,
-            group_name,
-            extra={r"%key%": matched_key},
-        )
+        return self.rules.get_template("increase_msg", group_id).text
 
     # ------------------ 事件处理 ------------------
 
@@ -674,7 +1351,11 @@ class JoinManager(Star):
         ):
             return
 
-        delay = self.config.get("delay", 0.5)
+        # 整个请求使用同一份规则与设置，处理途中热重载不影响本次请求
+        rules = self.rules
+        settings = rules.settings
+        level_limit = rules.level_limit
+        delay = settings.delay
         group_id = str(raw.get("group_id", ""))
         user_id = str(raw.get("user_id", ""))
         comment = raw.get("comment", "")
@@ -683,7 +1364,7 @@ class JoinManager(Star):
             f"[JoinManager] 收到申请 | Group: {group_id} | User: {user_id} | Msg: {comment}"
         )
 
-        if not self._check_permission(group_id):
+        if not settings.allows_group(group_id):
             return
         if flag:
             if flag in self.seen_group_request_flags:
@@ -696,25 +1377,22 @@ class JoinManager(Star):
                 self.seen_group_request_flags.clear()
                 self.seen_group_request_flags.add(flag)
 
-        group_name = await self._get_group_name(event, group_id)
-        comment_lower = comment.lower()
-        user_name = user_id
-        stranger_info: dict[str, Any] = {}
-
-        # Fetch profile once for nickname and optional level gate.
-        if event.get_platform_name() == "aiocqhttp":
-            stranger_info = await self._get_stranger_info(event, user_id)
-            fetched_name = stranger_info.get("nickname") or stranger_info.get("nick")
-            if fetched_name:
-                user_name = str(fetched_name)
-                logger.info(f"[JoinManager] 成功获取昵称: {user_name} ({user_id})")
-            else:
-                logger.debug(f"[JoinManager] 未获取到用户昵称: {user_id}")
+        # 群名称与用户资料在模板或统计图用到时才获取
+        data = self._template_data(event, group_id, user_id, comment=comment)
 
-        if self.level_limit_enabled:
+        if level_limit.enabled:
+            min_level = level_limit.min_level
+            stranger_info: dict[str, Any] = {}
+            # 等级限制需要用户资料，取得后模板的昵称与等级直接复用
+            if event.get_platform_name() == "aiocqhttp":
+                stranger_info = await self._get_stranger_info(event, user_id)
+                data.provide(
+                    "stranger_info", self._stranger_values(user_id, stranger_info)
+                )
             logger.debug(
                 "[JoinManager] 等级限制已启用: "
-                f"min_level={self.min_level}, reject_low_level={self.reject_low_level}"
+                f"min_level={min_level}, "
+                f"reject_low_level={level_limit.reject_low_level}"
             )
             raw_level = stranger_info.get("level", "")
             user_level = None
@@ -727,35 +1405,32 @@ class JoinManager(Star):
                     f"[JoinManager] 用户等级字段不可解析: user_id={user_id}, level={raw_level}"
                 )
 
-            if user_level is None or user_level < self.min_level:
+            if user_level is None or user_level < min_level:
                 if user_level is None:
                     if stranger_info.get("profile_available"):
-                        level_reason = f"接口未返回QQ等级，最低要求{self.min_level}级"
+                        level_reason = f"接口未返回QQ等级，最低要求{min_level}级"
                     else:
                         level_reason = (
-                            f"未获取到用户资料或QQ等级，最低要求{self.min_level}级"
+                            f"未获取到用户资料或QQ等级，最低要求{min_level}级"
                         )
                 else:
-                    level_reason = f"QQ等级{user_level}级低于最低要求{self.min_level}级"
+                    level_reason = f"QQ等级{user_level}级低于最低要求{min_level}级"
                 logger.info(
                     f"[JoinManager] 等级限制拦截用户: {user_id} | {level_reason}"
                 )
-                reject_message = self._format_placeholder(
-                    self.level_limit_reject_reason,
-                    group_id,
-                    user_id,
-                    user_name,
-                    group_name,
-                    extra={
-                        r"%user_level%": str(user_level)
-                        if user_level is not None
-                        else "",
-                        r"%min_level%": str(self.min_level),
-                        r"%level_reason%": level_reason,
+                reject_message = await data.render(
+                    level_limit.reject_reason,
+                    {
+                        "user_level": str(user_level) if user_level is not None else "",
+                        "min_level": str(min_level),
+                        "level_reason": level_reason,
                     },
                 )
 
-                if self.reject_low_level and event.get_platform_name() == "aiocqhttp":
+                if (
+                    level_limit.reject_low_level
+                    and event.get_platform_name() == "aiocqhttp"
+                ):
                     from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
                         AiocqhttpMessageEvent,
                     )
@@ -772,7 +1447,9 @@ class JoinManager(Star):
                         logger.info(
                             f"[JoinManager] 已按等级限制直接拒绝用户: {user_id}"
                         )
-                        target_sids = self.get_notice_session(event, "reject_notice")
+                        target_sids = self.get_notice_session(
+                            event, "reject_notice", settings
+                        )
                         if target_sids is not None:
                             chain: list[Comp.BaseMessageComponent] = [
                                 Comp.Plain(
@@ -804,21 +1481,21 @@ class JoinManager(Star):
                 f"[JoinManager] 用户等级通过限制: user_id={user_id}, level={user_level}"
             )
 
-        # ---------------- 关键词匹配 (自动拒绝) ----------------
-        reject_keywords = self.get_reject_keywords(group_id)
-        matched_reject_kw = None
+        # 验证消息归一化一次，拒绝词与同意规则一次扫描完成匹配
+        keyword_match = rules.get_keyword_matcher(group_id).match(comment)
 
-        for kw in reject_keywords:
-            if kw.lower() in comment_lower:
-                matched_reject_kw = kw
-                break
+        # ---------------- 关键词匹配 (自动拒绝) ----------------
+        matched_reject_kw = keyword_match.reject_keyword
 
         if matched_reject_kw:
             logger.info(
                 f"[JoinManager] 命中拒绝词: {matched_reject_kw} -> 拒绝用户: {user_id}"
             )
             # 拒绝理由
-            reject_reason = self.get_reject_reason(event, matched_reject_kw, group_name)
+            reject_reason = await data.render(
+                rules.get_template("reject_reason", group_id),
+                {"key": matched_reject_kw},
+            )
             if event.get_platform_name() == "aiocqhttp":
                 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
                     AiocqhttpMessageEvent,
@@ -833,7 +1510,9 @@ class JoinManager(Star):
                         approve=False,
                         reason=reject_reason,
                     )
-                    target_sids = self.get_notice_session(event, "reject_notice")
+                    target_sids = self.get_notice_session(
+                        event, "reject_notice", settings
+                    )
 
                     if target_sids is not None:
                         # 逐群发送
@@ -856,18 +1535,8 @@ class JoinManager(Star):
             return
 
         # ---------------- 关键词匹配 (自动同意) ----------------
-        matched_category = None
-        matched_keyword = None
-
-        accept_rules = self.get_accept_rules(group_id)
-        for category_name, keywords in accept_rules.items():
-            for kw in keywords:
-                if kw.lower() in comment_lower:
-                    matched_category = category_name
-                    matched_keyword = kw
-                    break
-            if matched_category:
-                break
+        matched_category = keyword_match.category
+        matched_keyword = keyword_match.accept_keyword
 
         if matched_category:
             logger.info(f"[JoinManager] 匹配成功 -> 分类: {matched_category}")
@@ -892,37 +1561,29 @@ class JoinManager(Star):
                 return
 
             if approved_success:
-                if group_id not in self.records:
-                    self.records[group_id] = {}
-
-                self.records[group_id][user_id] = {
-                    "accept_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "accept_reason": f"匹配关键词: {matched_keyword}",
-                    "category": matched_category,
-                }
-                self._save_records()
-
-                chart_path = None
-                disabled_statisics_group = self.config.get("divide_group", {}).get(
-                    "disabled_statistics", []
+                await self._add_record(
+                    group_id,
+                    user_id,
+                    {
+                        "accept_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "accept_reason": f"匹配关键词: {matched_keyword}",
+                        "category": matched_category,
+                    },
                 )
-                disabled_list_str = [str(g) for g in disabled_statisics_group]
 
-                if group_id not in disabled_list_str:
+                chart = None
+                if settings.statistics_enabled(group_id):
                     try:
-                        chart_path = await self._generate_chart(group_id, group_name)
+                        group_name = await self._get_group_name(event, group_id)
+                        data.provide("group_name", {"group_name": group_name})
+                        chart = await self._generate_chart(group_id, group_name)
                     except Exception as e:
                         logger.error(f"生成图表失败: {e}")
 
                 # 欢迎语处理 (支持占位符)
-                welcome_tmpl = self.get_welcome_msg(group_id)
-                welcome_msg = self._format_placeholder(
-                    welcome_tmpl,
-                    group_id,
-                    user_id,
-                    user_name,
-                    group_name,
-                    extra={r"%category%": matched_category, r"%comment%": comment},
+                welcome_msg = await data.render(
+                    rules.get_template("welcome_msg", group_id),
+                    {"category": matched_category},
                 )
 
                 sdmsg = (
@@ -931,12 +1592,13 @@ class JoinManager(Star):
                     + f"🏷️ 分类: {matched_category}\n"
                 )
 
-                if chart_path and chart_path.exists():
+                chart_image = self._chart_component(chart)
+                if chart_image is not None:
                     sdmsg += "\n📊 来源分布:"
                     chain: list[Comp.BaseMessageComponent] = [
                         Comp.At(qq=user_id),
                         Comp.Plain(sdmsg),
-                        Comp.Image.fromFileSystem(str(chart_path)),
+                        chart_image,
                     ]
                 else:
                     chain: list[Comp.BaseMessageComponent] = [
@@ -947,7 +1609,9 @@ class JoinManager(Star):
                 await asyncio.sleep(2)
 
                 try:
-                    target_sids = self.get_notice_session(event, "accept_notice")
+                    target_sids = self.get_notice_session(
+                        event, "accept_notice", settings
+                    )
                     if target_sids is not None:
                         # 逐群发送
                         for target_sid in target_sids:
@@ -960,10 +1624,10 @@ class JoinManager(Star):
                                         + f"📝 验证消息:\n{comment}\n"
                                         + f"🏷️ 分类: {matched_category}\n"
                                     )
-                                    if chart_path and chart_path.exists():
+                                    if chart_image is not None:
                                         wait_chain: list[Comp.BaseMessageComponent] = [
                                             Comp.Plain(tartget_msg),
-                                            Comp.Image.fromFileSystem(str(chart_path)),
+                                            chart_image,
                                         ]
                                     else:
                                         wait_chain: list[Comp.BaseMessageComponent] = [
@@ -981,7 +1645,7 @@ class JoinManager(Star):
                 except Exception as e:
                     logger.error(f"发送消息失败: {e}")
                 finally:
-                    await self._dispose_chart_path(chart_path)
+                    await self._dispose_chart(chart)
 
     @filter.event_message_type(filter.EventMessageType.ALL)
     async def on_group_decrease(self, event: AstrMessageEvent):
@@ -1004,37 +1668,29 @@ class JoinManager(Star):
         ):
             group_id = str(raw.get("group_id", ""))
             user_id = str(raw.get("user_id", ""))
+            rules = self.rules
+            settings = rules.settings
 
             # 权限检查
-            if not self._check_permission(group_id):
+            if not settings.allows_group(group_id):
                 return
-            group_name = await self._get_group_name(event, group_id)
 
             # 从数据中移除
-            if group_id in self.records:
-                if user_id in self.records[group_id]:
-                    self.records[group_id].pop(user_id)
-                    logger.info(
-                        f"[JoinManager] 用户 {user_id} 退出群 {group_id}，已从统计记录中移除"
-                    )
-                    self._save_records()
-
-            user_name = user_id
-            fetched_name = await self._get_user_nickname(event, user_id)
-            if fetched_name:
-                user_name = fetched_name
+            if await self._remove_record(group_id, user_id):
+                logger.info(
+                    f"[JoinManager] 用户 {user_id} 退出群 {group_id}，已从统计记录中移除"
+                )
 
-            decrease_tmpl = self.get_decrease_msg(group_id)
+            decrease_tmpl = rules.get_template("decrease_msg", group_id)
             if not decrease_tmpl:
                 return
 
-            final_msg = self._format_placeholder(
-                decrease_tmpl, group_id, user_id, user_name, group_name
-            )
-            target_sids = self.get_notice_session(event, "decrease_notice")
+            data = self._template_data(event, group_id, user_id)
+            final_msg = await data.render(decrease_tmpl)
+            target_sids = self.get_notice_session(event, "decrease_notice", settings)
 
             if target_sids:
-                delay = self.config.get("delay", 0.5)
+                delay = settings.delay
                 for target_sid in target_sids:
                     try:
                         await self.context.send_message(
@@ -1070,62 +1726,52 @@ class JoinManager(Star):
             user_id = str(raw.get("user_id", ""))
 
             await asyncio.sleep(2)
+            rules = self.rules
+            settings = rules.settings
             # 权限检查
-            if not self._check_permission(group_id):
+            if not settings.allows_group(group_id):
                 return
-            group_name = await self._get_group_name(event, group_id)
-
-            if group_id not in self.records:
-                self.records[group_id] = {}
 
             # 检查是否是自动审核
-            if user_id in self.records[group_id]:
+            group_records = await self._ensure_group_loaded(group_id)
+            if group_records is not None and user_id in group_records:
                 return
 
             # 加入统计数据（分类: 人工审核）
-            self.records[group_id][user_id] = {
-                "accept_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "accept_reason": "人工审核",
-                "category": "人工审核",
-            }
-            self._save_records()
+            await self._add_record(
+                group_id,
+                user_id,
+                {
+                    "accept_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "accept_reason": "人工审核",
+                    "category": "人工审核",
+                },
+            )
 
-            inscrease_tmpl = self.get_increase_msg(group_id)
+            inscrease_tmpl = rules.get_template("increase_msg", group_id)
             if not inscrease_tmpl:
                 return
 
-            chart_path = None
-            disabled_statisics_group = self.config.get("divide_group", {}).get(
-                "disabled_statistics", []
-            )
-            disabled_list_str = [str(g) for g in disabled_statisics_group]
-
-            if group_id not in disabled_list_str:
+            data = self._template_data(event, group_id, user_id)
+            chart = None
+            if settings.statistics_enabled(group_id):
                 try:
-                    chart_path = await self._generate_chart(group_id, group_name)
+                    group_name = await self._get_group_name(event, group_id)
+                    data.provide("group_name", {"group_name": group_name})
+                    chart = await self._generate_chart(group_id, group_name)
                 except Exception as e:
                     logger.error(f"生成图表失败: {e}")
 
             # 构造欢迎消息
-            user_name = user_id
-            fetched_name = await self._get_user_nickname(event, user_id)
-            if fetched_name:
-                user_name = fetched_name
-
-            welcome_msg = self._format_placeholder(
-                text=inscrease_tmpl,
-                group_id=group_id,
-                user_id=user_id,
-                user_name=user_name,
-                group_name=group_name,
-            )
+            welcome_msg = await data.render(inscrease_tmpl)
             sdmsg = f" 🎉 {welcome_msg}\n" + "🏷️ 分类: 人工审核"
-            if chart_path and chart_path.exists():
+            chart_image = self._chart_component(chart)
+            if chart_image is not None:
                 sdmsg += "\n\n📊 来源分布:"
                 chain: list[Comp.BaseMessageComponent] = [
                     Comp.At(qq=user_id),
                     Comp.Plain(sdmsg),
-                    Comp.Image.fromFileSystem(str(chart_path)),
+                    chart_image,
                 ]
             else:
                 chain: list[Comp.BaseMessageComponent] = [
@@ -1133,8 +1779,8 @@ class JoinManager(Star):
                     Comp.Plain(sdmsg),
                 ]
 
-            target_sids = self.get_notice_session(event, "increase_notice")
-            delay = self.config.get("delay", 0.5)
+            target_sids = self.get_notice_session(event, "increase_notice", settings)
+            delay = settings.delay
 
             if target_sids is not None:
                 try:
@@ -1148,10 +1794,10 @@ class JoinManager(Star):
                                     f"🎉 群{group_id} 已由管理员审核通过{user_id}的请求\n"
                                     + "🏷️ 分类: 人工审核\n"
                                 )
-                                if chart_path and chart_path.exists():
+                                if chart_image is not None:
                                     wait_chain: list[Comp.BaseMessageComponent] = [
                                         Comp.Plain(tartget_msg),
-                                        Comp.Image.fromFileSystem(str(chart_path)),
+                                        chart_image,
                                     ]
                                 else:
                                     wait_chain: list[Comp.BaseMessageComponent] = [
@@ -1167,9 +1813,9 @@ class JoinManager(Star):
                             logger.error(f"发送消息到{target_sid}失败: {e}")
                         await asyncio.sleep(delay)
                 finally:
-                    await self._dispose_chart_path(chart_path)
+                    await self._dispose_chart(chart)
             else:
-                await self._dispose_chart_path(chart_path)
+                await self._dispose_chart(chart)
 
     @filter.command("入群统计", alias={"加群统计"})
     async def on_statistics_command(self, event: AstrMessageEvent):
@@ -1181,22 +1827,24 @@ class JoinManager(Star):
             return
 
         # 非空检查
-        if group_id not in self.records:
+        await self._ensure_records_ready()
+        if not self._has_group(group_id):
             yield event.plain_result("本群暂无统计数据！")
             return
 
         # 生成统计图
-        chart_path = None
+        chart = None
         try:
             group_name = await self._get_group_name(event, group_id)
-            chart_path = await self._generate_chart(group_id, group_name)
+            chart = await self._generate_chart(group_id, group_name)
         except Exception as e:
             logger.error(f"生成图表失败: {e}")
 
         try:
-            if chart_path and chart_path.exists():
-                yield event.image_result(str(chart_path))
+            chart_image = self._chart_component(chart)
+            if chart_image is not None:
+                yield event.chain_result([chart_image])
             else:
                 yield event.plain_result("生成图表出错，请重试！")
         finally:
-            await self._dispose_chart_path(chart_path)
+            await self._dispose_chart(chart)
@@ -0,0 +1,149 @@
+# matching.py
+# 加群验证消息的关键词匹配
+from typing import NamedTuple
+
+from .normalize import normalize_text
+
+# 关键词少于该数量时逐个子串查找更快，不构建自动机
+AUTOMATON_MIN_KEYWORDS = 32
+
+_NO_MATCH = 1 << 62
+
+
+class KeywordMatch(NamedTuple):
+    # 命中的拒绝词
+    reject_keyword: str | None = None
+    # 命中的同意分类及关键词
+    category: str | None = None
+    accept_keyword: str | None = None
+
+
+class KeywordMatcher:
+    """拒绝词与同意规则编译成的多模式匹配器 (Aho-Corasick)
+
+    关键词在编译时转为小写 (并按 table 归一化)，匹配时验证消息经过同样的
+    处理后只需扫描一遍。与逐个查找的结果一致：拒绝词取配置中最靠前的命中，
+    同意规则按分类、关键词的配置顺序取最靠前的命中。
+    """
+
+    __slots__ = (
+        "table",
+        "reject_keywords",
+        "accepts",
+        "goto",
+        "fail",
+        "reject_at",
+        "accept_at",
+        "use_automaton",
+    )
+
+    def __init__(
+        self,
+        reject_keywords: list[str],
+        accept_rules: dict[str, list[str]],
+        table: dict[int, int | None] | None = None,
+    ):
+        self.table = table
+        # 归一化后为空的关键词 (如只有空格) 会命中任何消息，直接忽略
+        self.reject_keywords = [
+            (pattern, kw)
+            for kw in reject_keywords
+            if (pattern := normalize_text(kw, table))
+        ]
+        # 按配置顺序展开的 (归一化关键词, 分类, 原关键词)，下标即优先级
+        self.accepts = [
+            (pattern, category, kw)
+            for category, keywords in accept_rules.items()
+            for kw in keywords
+            if (pattern := normalize_text(kw, table))
+        ]
+        self.use_automaton = (
+            len(self.reject_keywords) + len(self.accepts) >= AUTOMATON_MIN_KEYWORDS
+        )
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # 每个状态 (含其后缀状态) 能命中的最靠前的拒绝词 / 同意关键词下标
+        self.reject_at: list[int] = [_NO_MATCH]
+        self.accept_at: list[int] = [_NO_MATCH]
+        if self.use_automaton:
+            self._build()
+
+    def _insert(self, pattern: str) -> int:
+        node = 0
+        for ch in pattern:
+            next_node = self.goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][ch] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.reject_at.append(_NO_MATCH)
+                self.accept_at.append(_NO_MATCH)
+            node = next_node
+        return node
+
+    def _build(self):
+        for index, (pattern, _) in enumerate(self.reject_keywords):
+            node = self._insert(pattern)
+            self.reject_at[node] = min(self.reject_at[node], index)
+        for index, (pattern, _, _) in enumerate(self.accepts):
+            node = self._insert(pattern)
+            self.accept_at[node] = min(self.accept_at[node], index)
+
+        # 按层序计算失败指针，并把后缀状态的命中合并进来
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, child in self.goto[node].items():
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                fail_state = self.goto[state].get(ch, 0)
+                self.fail[child] = fail_state if fail_state != child else 0
+                self.reject_at[child] = min(
+                    self.reject_at[child], self.reject_at[self.fail[child]]
+                )
+                self.accept_at[child] = min(
+                    self.accept_at[child], self.accept_at[self.fail[child]]
+                )
+                queue.append(child)
+
+    def match(self, comment: str) -> KeywordMatch:
+        """匹配原始验证消息"""
+        comment = normalize_text(comment, self.table)
+        if not self.use_automaton:
+            return self._match_scan(comment)
+
+        goto = self.goto
+        fail = self.fail
+        reject_at = self.reject_at
+        accept_at = self.accept_at
+        best_reject = _NO_MATCH
+        best_accept = _NO_MATCH
+        node = 0
+        for ch in comment:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if reject_at[node] < best_reject:
+                best_reject = reject_at[node]
+                if best_reject == 0:
+                    # 不会有更靠前的拒绝词，命中拒绝词时也不再需要同意规则
+                    break
+            if accept_at[node] < best_accept:
+                best_accept = accept_at[node]
+
+        if best_reject != _NO_MATCH:
+            return KeywordMatch(reject_keyword=self.reject_keywords[best_reject][1])
+        if best_accept != _NO_MATCH:
+            _, category, kw = self.accepts[best_accept]
+            return KeywordMatch(category=category, accept_keyword=kw)
+        return KeywordMatch()
+
+    def _match_scan(self, comment: str) -> KeywordMatch:
+        for pattern, kw in self.reject_keywords:
+            if pattern in comment:
+                return KeywordMatch(reject_keyword=kw)
+        for pattern, category, kw in self.accepts:
+            if pattern in comment:
+                return KeywordMatch(category=category, accept_keyword=kw)
+        return KeywordMatch()
@@ -0,0 +1,74 @@
+# normalize.py
+# 关键词匹配前的文本归一化，转换表在加载规则时构建一次，之后只做 str.translate
+from functools import lru_cache
+
+# 零宽字符与其他不可见的格式字符
+INVISIBLE_CHARS = "\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\ufeff\u00ad"
+# 各种空白 (含全角空格、不换行空格)
+SPACE_CHARS = (
+    " \t\r\n\u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005"
+    "\u2006\u2007\u2008\u2009\u200a\u202f\u205f\u3000"
+)
+
+# 常用繁体字 -> 简体字，一一对应
+TRADITIONAL_CHARS = (
+    "愛罷備貝筆畢邊變賓補財參蠶殘慚倉層產長場車徹塵陳稱誠遲齒衝蟲醜處傳創辭從錯達帶單"
+    "膽當黨導燈遞點電釣調訂東動鬥獨斷隊對噸奪兒爾發髮罰範飯費豐風鳳婦復複趕剛鋼個給鞏"
+    "貢溝構購夠顧關觀館廣歸貴國過號漢後壞劃華話歡環換還黃會彙匯獲機積擊雞極級幾際記計"
+    "濟繼價駕間簡見減薦將獎講醬膠腳覺較階節結潔緊盡進經驚競鏡舊舉劇據決絕軍開殼課懇庫"
+    "誇塊礦虧擴來藍蘭欄爛勞樂類離禮裡裏歷曆麗聯連煉練糧兩輛療獵臨靈齡領劉龍樓錄陸論羅"
+    "邏驢媽馬嗎買賣麥滿貓門們夢彌綿麵廟滅鳴難腦鬧內擬鳥農濃諾歐盤賠噴評蘋撲齊騎豈啟氣"
+    "棄錢槍牆強搶橋親輕傾請慶窮區驅權勸確讓熱認榮軟灑賽傘喪掃殺曬傷賞燒紹設攝審聲繩勝"
+    "聖師時識實勢釋適書輸數術樹雙誰稅順說絲飼鬆訴肅雖隨歲孫損縮鎖態攤談嘆湯討題體條鐵"
+    "聽廳頭圖團襪灣萬網為圍衛維偉謂溫聞問穩臥無務霧誤習係繫戲細蝦嚇鮮閒顯險現線鄉響項"
+    "蕭銷曉協寫謝興選學詢壓鴨亞煙嚴鹽驗陽養樣藥爺業葉頁醫儀億藝憶義議陰銀飲隱應營贏傭"
+    "優憂郵遊魚與語預遠員園願約躍閱雲運雜災載讚髒則責賊贈紮齋債戰張漲帳賬趙這鎮陣徵證"
+    "鄭織職執紙質製鐘鍾種眾週豬燭囑築專轉賺莊裝壯狀準濁資總縱鑽組頻視嗶碼貸賭幣紅鏈掛"
+    "騙註冊彈訊簽麼沒該讀幫戶屬於憑閃擺貨廠淨"
+)
+SIMPLIFIED_CHARS = (
+    "爱罢备贝笔毕边变宾补财参蚕残惭仓层产长场车彻尘陈称诚迟齿冲虫丑处传创辞从错达带单"
+    "胆当党导灯递点电钓调订东动斗独断队对吨夺儿尔发发罚范饭费丰风凤妇复复赶刚钢个给巩"
+    "贡沟构购够顾关观馆广归贵国过号汉后坏划华话欢环换还黄会汇汇获机积击鸡极级几际记计"
+    "济继价驾间简见减荐将奖讲酱胶脚觉较阶节结洁紧尽进经惊竞镜旧举剧据决绝军开壳课恳库"
+    "夸块矿亏扩来蓝兰栏烂劳乐类离礼里里历历丽联连炼练粮两辆疗猎临灵龄领刘龙楼录陆论罗"
+    "逻驴妈马吗买卖麦满猫门们梦弥绵面庙灭鸣难脑闹内拟鸟农浓诺欧盘赔喷评苹扑齐骑岂启气"
+    "弃钱枪墙强抢桥亲轻倾请庆穷区驱权劝确让热认荣软洒赛伞丧扫杀晒伤赏烧绍设摄审声绳胜"
+    "圣师时识实势释适书输数术树双谁税顺说丝饲松诉肃虽随岁孙损缩锁态摊谈叹汤讨题体条铁"
+    "听厅头图团袜湾万网为围卫维伟谓温闻问稳卧无务雾误习系系戏细虾吓鲜闲显险现线乡响项"
+    "萧销晓协写谢兴选学询压鸭亚烟严盐验阳养样药爷业叶页医仪亿艺忆义议阴银饮隐应营赢佣"
+    "优忧邮游鱼与语预远员园愿约跃阅云运杂灾载赞脏则责贼赠扎斋债战张涨帐账赵这镇阵征证"
+    "郑织职执纸质制钟钟种众周猪烛嘱筑专转赚庄装壮状准浊资总纵钻组频视哔码贷赌币红链挂"
+    "骗注册弹讯签么没该读帮户属于凭闪摆货厂净"
+)
+
+
+@lru_cache(maxsize=8)
+def build_translation_table(
+    ignore_spaces: bool = True, traditional: bool = True
+) -> dict[int, int | None]:
+    """构建归一化用的 str.translate 转换表
+
+    全角字母、数字与符号总是转为半角，零宽字符总是删除；
+    ignore_spaces 时删除全部空白，traditional 时把常用繁体字转为简体字。
+    """
+    table: dict[int, int | None] = {
+        code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)
+    }
+    table[0x3000] = ord(" ")
+    if traditional:
+        table.update(zip(map(ord, TRADITIONAL_CHARS), map(ord, SIMPLIFIED_CHARS)))
+    for ch in INVISIBLE_CHARS:
+        table[ord(ch)] = None
+    if ignore_spaces:
+        for ch in SPACE_CHARS:
+            table[ord(ch)] = None
+    return table
+
+
+def normalize_text(text: str, table: dict[int, int | None] | None) -> str:
+    """转为小写并按转换表归一化；table 为 None 时只转小写"""
+    if table is None:
+        return text.lower()
+    # 先转换再转小写，全角大写字母也能转为半角小写
+    return text.translate(table).lower()
@@ -0,0 +1,399 @@
+# records.py
+import heapq
+from array import array
+from collections import Counter
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_time(value: Any) -> int:
+    """把 accept_time 字符串转为秒级时间戳，无法解析时返回 0"""
+    if not value:
+        return 0
+    try:
+        return int(datetime.fromisoformat(str(value)).timestamp())
+    except (TypeError, ValueError, OverflowError, OSError):
+        return 0
+
+
+def format_time(timestamp: int) -> str:
+    """把秒级时间戳转回 accept_time 字符串，0 表示未知"""
+    if not timestamp:
+        return ""
+    # 整秒时间戳的 isoformat 与 TIME_FORMAT 输出一致，且快得多
+    return datetime.fromtimestamp(timestamp).isoformat(" ")
+
+
+class InternTable:
+    """字符串驻留表：相同的分类/理由只保存一份，记录里只存小整数 ID"""
+
+    __slots__ = ("values", "ids")
+
+    def __init__(self):
+        self.values: list[str] = []
+        self.ids: dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self.ids[value] = value_id
+        return value_id
+
+    def __getitem__(self, value_id: int) -> str:
+        return self.values[value_id]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+# 全部群共用的驻留表；只追加不删除，后台线程读取是安全的
+CATEGORIES = InternTable()
+REASONS = InternTable()
+
+
+class GroupStats:
+    """单个群的增量统计：分类人数、总人数与入群时间范围
+
+    入群/退群时增量更新，生成图表时无需再扫描群内全部记录。
+    时间范围用带惰性删除的最小/最大堆维护，退群移除边界记录也不必重新扫描。
+    """
+
+    __slots__ = (
+        "category_counts",
+        "total",
+        "_time_counts",
+        "_min_heap",
+        "_max_heap",
+    )
+
+    def __init__(self):
+        self.category_counts: dict[str, int] = {}
+        self.total = 0
+        self._time_counts: dict[int, int] = {}
+        self._min_heap: list[int] = []
+        self._max_heap: list[int] = []
+
+    @classmethod
+    def from_columns(cls, times: array, category_ids: array) -> "GroupStats":
+        """由整列数据一次性构建，避免逐条 add"""
+        stats = cls()
+        stats.category_counts = {
+            CATEGORIES[category_id]: count
+            for category_id, count in Counter(category_ids).items()
+        }
+        stats.total = len(times)
+        time_counts = Counter(times)
+        time_counts.pop(0, None)
+        stats._time_counts = dict(time_counts)
+        stats._min_heap = list(stats._time_counts)
+        heapq.heapify(stats._min_heap)
+        stats._max_heap = [-value for value in stats._time_counts]
+        heapq.heapify(stats._max_heap)
+        return stats
+
+    def add(self, category: str, timestamp: int):
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        self.total += 1
+
+        if timestamp:
+            count = self._time_counts.get(timestamp, 0)
+            self._time_counts[timestamp] = count + 1
+            if count == 0:
+                heapq.heappush(self._min_heap, timestamp)
+                heapq.heappush(self._max_heap, -timestamp)
+
+    def remove(self, category: str, timestamp: int):
+        count = self.category_counts.get(category, 0)
+        if count <= 1:
+            self.category_counts.pop(category, None)
+        else:
+            self.category_counts[category] = count - 1
+        self.total = max(self.total - 1, 0)
+
+        count = self._time_counts.get(timestamp, 0)
+        if count <= 1:
+            # 堆中的旧值在查询时惰性剔除
+            self._time_counts.pop(timestamp, None)
+        else:
+            self._time_counts[timestamp] = count - 1
+
+        # 反复进出同一时间点会在堆里留下重复项，过多时重建
+        if len(self._min_heap) > 2 * len(self._time_counts) + 64:
+            self._min_heap = list(self._time_counts)
+            heapq.heapify(self._min_heap)
+            self._max_heap = [-value for value in self._time_counts]
+            heapq.heapify(self._max_heap)
+
+    def _first_time(self) -> int:
+        while self._min_heap and self._min_heap[0] not in self._time_counts:
+            heapq.heappop(self._min_heap)
+        return self._min_heap[0] if self._min_heap else 0
+
+    def _last_time(self) -> int:
+        while self._max_heap and -self._max_heap[0] not in self._time_counts:
+            heapq.heappop(self._max_heap)
+        return -self._max_heap[0] if self._max_heap else 0
+
+    def summary(self) -> dict[str, Any]:
+        """生成绘图用的统计摘要，格式与 summarize_records 一致"""
+        return {
+            "category_counts": dict(self.category_counts),
+            "first_time": format_time(self._first_time()),
+            "last_time": format_time(self._last_time()),
+        }
+
+
+class GroupRecords:
+    """单个群的紧凑入群记录
+
+    按列存放：用户 ID 列表 + 时间戳 / 分类 ID / 理由 ID 三个数组，
+    分类与理由通过驻留表共享，删除时用末行填补空位。
+    对外仍按 {user_id: {"accept_time", "accept_reason", "category"}} 读写，
+    磁盘上的 JSON 格式与图表代码均不受影响。
+    """
+
+    __slots__ = (
+        "user_index",
+        "user_ids",
+        "times",
+        "category_ids",
+        "reason_ids",
+        "stats",
+    )
+
+    def __init__(self):
+        self.user_index: dict[str, int] = {}
+        self.user_ids: list[str] = []
+        self.times = array("q")
+        self.category_ids = array("I")
+        self.reason_ids = array("I")
+        self.stats: GroupStats | None = GroupStats()
+
+    @classmethod
+    def from_dict(cls, group_records: dict) -> "GroupRecords":
+        compact = cls()
+        for user_id, record in group_records.items():
+            if isinstance(record, dict):
+                compact.set(str(user_id), record)
+        return compact
+
+    @classmethod
+    def from_columns(
+        cls,
+        user_ids: list[str],
+        times: array,
+        category_ids: array,
+        reason_ids: array,
+    ) -> "GroupRecords":
+        """直接由列数据构建，ID 需已是全局驻留表中的 ID"""
+        compact = cls.__new__(cls)
+        compact.user_ids = user_ids
+        compact.user_index = dict(zip(user_ids, range(len(user_ids))))
+        compact.times = times
+        compact.category_ids = category_ids
+        compact.reason_ids = reason_ids
+        compact.stats = GroupStats.from_columns(times, category_ids)
+        return compact
+
+    def copy(self) -> "GroupRecords":
+        """复制数据列，供后台线程序列化；副本不携带统计"""
+        clone = GroupRecords.__new__(GroupRecords)
+        clone.user_index = dict(self.user_index)
+        clone.user_ids = list(self.user_ids)
+        clone.times = array("q", self.times)
+        clone.category_ids = array("I", self.category_ids)
+        clone.reason_ids = array("I", self.reason_ids)
+        clone.stats = None
+        return clone
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self.user_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.user_ids)
+
+    def _record_at(self, row: int) -> dict[str, str]:
+        return {
+            "accept_time": format_time(self.times[row]),
+            "accept_reason": REASONS[self.reason_ids[row]],
+            "category": CATEGORIES[self.category_ids[row]],
+        }
+
+    def get(self, user_id: str) -> dict[str, str] | None:
+        row = self.user_index.get(user_id)
+        if row is None:
+            return None
+        return self._record_at(row)
+
+    def set(self, user_id: str, record: dict[str, Any]):
+        category = str(record.get("category", "未知"))
+        timestamp = parse_time(record.get("accept_time", ""))
+        category_id = CATEGORIES.intern(category)
+        reason_id = REASONS.intern(str(record.get("accept_reason", "")))
+
+        row = self.user_index.get(user_id)
+        if row is None:
+            self.user_index[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.times.append(timestamp)
+            self.category_ids.append(category_id)
+            self.reason_ids.append(reason_id)
+        else:
+            if self.stats is not None:
+                old_category = CATEGORIES[self.category_ids[row]]
+                self.stats.remove(old_category, self.times[row])
+            self.times[row] = timestamp
+            self.category_ids[row] = category_id
+            self.reason_ids[row] = reason_id
+
+        if self.stats is not None:
+            self.stats.add(category, timestamp)
+
+    def pop(self, user_id: str) -> dict[str, str] | None:
+        row = self.user_index.pop(user_id, None)
+        if row is None:
+            return None
+
+        record = self._record_at(row)
+        if self.stats is not None:
+            self.stats.remove(record["category"], self.times[row])
+
+        last = len(self.user_ids) - 1
+        if row != last:
+            moved_user_id = self.user_ids[last]
+            self.user_ids[row] = moved_user_id
+            self.times[row] = self.times[last]
+            self.category_ids[row] = self.category_ids[last]
+            self.reason_ids[row] = self.reason_ids[last]
+            self.user_index[moved_user_id] = row
+        self.user_ids.pop()
+        self.times.pop()
+        self.category_ids.pop()
+        self.reason_ids.pop()
+        return record
+
+    def pop_older_than(self, cutoff: int) -> list[tuple[str, int, str]]:
+        """移除入群时间早于 cutoff 的记录，返回 (用户ID, 时间戳, 分类) 列表
+
+        入群时间未知的记录无法归入时间段，保留在明细中。
+        """
+        expired = [
+            (self.user_ids[row], timestamp, CATEGORIES[self.category_ids[row]])
+            for row, timestamp in enumerate(self.times)
+            if 0 < timestamp < cutoff
+        ]
+        for user_id, _, _ in expired:
+            self.pop(user_id)
+        return expired
+
+    def items(self) -> Iterator[tuple[str, dict[str, str]]]:
+        for row, user_id in enumerate(self.user_ids):
+            yield user_id, self._record_at(row)
+
+    def values(self) -> Iterator[dict[str, str]]:
+        for row in range(len(self.user_ids)):
+            yield self._record_at(row)
+
+    def to_dict(self) -> dict[str, dict[str, str]]:
+        return dict(self.items())
+
+
+def period_of(timestamp: int, granularity: str) -> str:
+    """把时间戳归入汇总时间段: day -> 2026-01-31，month -> 2026-01"""
+    period_format = "%Y-%m" if granularity == "month" else "%Y-%m-%d"
+    return datetime.fromtimestamp(timestamp).strftime(period_format)
+
+
+class GroupRollup:
+    """单个群超过保留期、已汇总的入群记录
+
+    只按 时间段 -> 分类 -> 人数 保存，不再保留用户明细，
+    因此这部分成员退群时无法再从统计中扣除。
+    """
+
+    __slots__ = ("periods", "category_totals")
+
+    def __init__(self):
+        self.periods: dict[str, dict[str, int]] = {}
+        self.category_totals: dict[str, int] = {}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GroupRollup":
+        rollup = cls()
+        for period, counts in data.items():
+            if not isinstance(counts, dict):
+                continue
+            for category, count in counts.items():
+                try:
+                    rollup.add(str(period), str(category), int(count))
+                except (TypeError, ValueError):
+                    continue
+        return rollup
+
+    def to_dict(self) -> dict[str, dict[str, int]]:
+        return {period: dict(counts) for period, counts in self.periods.items()}
+
+    def add(self, period: str, category: str, count: int = 1):
+        counts = self.periods.setdefault(period, {})
+        counts[category] = counts.get(category, 0) + count
+        self.category_totals[category] = self.category_totals.get(category, 0) + count
+
+    def first_time(self) -> str:
+        if not self.periods:
+            return ""
+        first_period = min(self.periods)
+        if len(first_period) == 7:
+            first_period = f"{first_period}-01"
+        return f"{first_period} 00:00:00"
+
+    def last_time(self) -> str:
+        if not self.periods:
+            return ""
+        last_period = max(self.periods)
+        if len(last_period) == 7:
+            last_period = f"{last_period}-01"
+        return f"{last_period} 00:00:00"
+
+    def merge_into(self, summary: dict[str, Any]) -> dict[str, Any]:
+        """把汇总数据合并进绘图用的统计摘要"""
+        category_counts = dict(summary.get("category_counts", {}))
+        for category, count in self.category_totals.items():
+            category_counts[category] = category_counts.get(category, 0) + count
+
+        first_time = summary.get("first_time", "")
+        rollup_first = self.first_time()
+        if rollup_first and (not first_time or rollup_first < first_time):
+            first_time = rollup_first
+        last_time = summary.get("last_time", "") or self.last_time()
+        return {
+            "category_counts": category_counts,
+            "first_time": first_time,
+            "last_time": last_time,
+        }
+
+
+def as_group_records(group_records: Any) -> GroupRecords:
+    """把存储读出的群记录 (字典或 GroupRecords) 统一为 GroupRecords"""
+    if isinstance(group_records, GroupRecords):
+        return group_records
+    if isinstance(group_records, dict):
+        return GroupRecords.from_dict(group_records)
+    return GroupRecords()
+
+
+def to_plain_records(records: dict) -> dict[str, dict[str, dict[str, str]]]:
+    """把 {group_id: GroupRecords} 转回可直接写入 JSON 的嵌套字典"""
+    return {
+        group_id: group_records.to_dict()
+        if isinstance(group_records, GroupRecords)
+        else group_records
+        for group_id, group_records in records.items()
+    }
@@ -0,0 +1,183 @@
+# render.py
+import asyncio
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+from astrbot.api import logger
+
+# 绘图引擎名称 -> 模块，两个模块提供相同的 draw_chart / render_chart_bytes / prewarm
+CHART_ENGINES = {
+    "fast": "draw_fast",
+    "matplotlib": "draw",
+}
+
+
+_import_lock = threading.Lock()
+
+
+def get_engine_module(engine: str) -> ModuleType:
+    """按需导入绘图引擎模块，未选用的引擎不会被导入；首次导入时记录耗时
+
+    始终在锁内导入：预热线程导入到一半时 sys.modules 中已经有这个模块，
+    不加锁直接取用会拿到尚未初始化完的模块。
+    """
+    name = f"{__package__}.{CHART_ENGINES[engine]}"
+    with _import_lock:
+        if name in sys.modules:
+            return importlib.import_module(name)
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+    elapsed = (time.perf_counter() - start) * 1000
+    logger.info(f"[JoinManager] 绘图引擎 {engine} 导入耗时 {elapsed:.0f} ms")
+    return module
+
+
+def _call_engine(engine: str, func_name: str, *args) -> Any:
+    # 以名称调用，主进程无需为了序列化绘图函数而导入绘图引擎
+    return getattr(get_engine_module(engine), func_name)(*args)
+
+
+def _init_worker(engine: str, assets_dir: Path, font_name: str, bg_img_name: str):
+    """渲染进程启动时预先导入绘图引擎并加载字体与背景图"""
+    try:
+        get_engine_module(engine).prewarm(assets_dir, font_name, bg_img_name)
+    except Exception as e:
+        logger.warning(f"[JoinManager] 渲染进程预热失败: {e}")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ChartRenderer:
+    """统计图渲染引擎
+
+    process 模式下由常驻的进程池绘图，多个群的统计图可以在多个核心上并行，
+    不再因 GIL 互相排队、拖慢机器人主进程；进程池不可用时回退为线程绘图。
+    同时在绘制和排队的任务数不超过 queue_size，超出的调用方等待空位。
+    """
+
+    # 进程池连续出错达到该次数后不再重建，之后一直使用线程绘图
+    MAX_POOL_FAILURES = 3
+
+    def __init__(
+        self,
+        mode: str,
+        engine: str,
+        workers: int,
+        queue_size: int,
+        assets_dir: Path,
+        font_name: str,
+        bg_img_name: str,
+        prewarm: bool = False,
+    ):
+        self.mode = mode
+        self.engine = engine
+        self.prewarm = prewarm
+        self.workers = max(workers, 1)
+        self.queue_size = max(queue_size, 1)
+        self.assets_dir = assets_dir
+        self.font_name = font_name
+        self.bg_img_name = bg_img_name
+        self.executor: ProcessPoolExecutor | None = None
+        self.pool_failures = 0
+        self.slots = asyncio.Semaphore(self.queue_size)
+
+    @property
+    def use_process(self) -> bool:
+        return self.mode == "process" and self.pool_failures < self.MAX_POOL_FAILURES
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            # 机器人主进程中有事件循环和其他线程，fork 不安全，使用 spawn 启动
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    self.engine,
+                    self.assets_dir,
+                    self.font_name,
+                    self.bg_img_name,
+                ),
+            )
+        return self.executor
+
+    def _on_pool_failure(self, error: Exception):
+        self.pool_failures += 1
+        logger.warning(f"[JoinManager] 渲染进程池不可用，本次改用线程绘图: {error}")
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def start(self):
+        """预热绘图引擎，避免首次绘图等待导入与进程启动
+
+        process 模式启动全部渲染进程并在其中预热；thread 模式在后台线程中导入
+        绘图引擎并加载字体与背景图。未开启预热时，首次绘图才导入绘图引擎。
+        """
+        if not self.prewarm:
+            return
+        if not self.use_process:
+            await asyncio.to_thread(
+                _init_worker,
+                self.engine,
+                self.assets_dir,
+                self.font_name,
+                self.bg_img_name,
+            )
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            executor = self._get_executor()
+            pids = await asyncio.gather(
+                *(loop.run_in_executor(executor, _ping) for _ in range(self.workers))
+            )
+        except Exception as e:
+            self._on_pool_failure(e)
+            return
+        logger.info(f"[JoinManager] 渲染进程已就绪: {len(set(pids))} 个")
+
+    async def _run(self, func_name: str, *args) -> Any:
+        async with self.slots:
+            if self.use_process:
+                loop = asyncio.get_running_loop()
+                try:
+                    result = await loop.run_in_executor(
+                        self._get_executor(),
+                        _call_engine,
+                        self.engine,
+                        func_name,
+                        *args,
+                    )
+                except Exception as e:
+                    # 绘图函数自身的异常已在内部处理，这里只会是进程池故障
+                    self._on_pool_failure(e)
+                else:
+                    self.pool_failures = 0
+                    return result
+            # 导入绘图引擎同样发生在线程中，不阻塞事件循环
+            return await asyncio.to_thread(
+                _call_engine, self.engine, func_name, *args
+            )
+
+    async def render(self, *args) -> bool:
+        """绘制统计图到文件，参数与 draw.draw_chart 相同"""
+        return await self._run("draw_chart", *args)
+
+    async def render_bytes(self, *args) -> bytes | None:
+        """绘制统计图并返回图片数据，参数与 draw.render_chart_bytes 相同"""
+        return await self._run("render_chart_bytes", *args)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,414 @@
+# rules.py
+# 关键词规则、消息模板、等级限制与分群/通知设置的解析；配置变化时只重建变化的部分
+import json
+from typing import Any, NamedTuple
+
+from .matching import KeywordMatcher
+from .normalize import build_translation_table
+from .templates import MessageTemplate, compile_template
+
+DEFAULT_GROUP_ID = "default"
+
+MESSAGE_DEFAULTS = {
+    "welcome_msg": "欢迎新成员！通过自动审核",
+    "reject_reason": "检测到关键词%key%，拒绝申请",
+    "decrease_msg": "呜呜呜~ %user_name%(%user_id%)退出了群聊",
+    "increase_msg": "恭喜你通过人工审核，欢迎入群~",
+}
+
+# 支持热重载的配置项
+RULE_CONFIG_KEYS = (
+    "accept_rules",
+    "reject_rules",
+    "message_templates",
+    "level_limit",
+    "keyword_normalize",
+    "divide_group",
+    "notice",
+    "delay",
+)
+# 由这些配置项构建 EventSettings
+SETTINGS_CONFIG_KEYS = ("divide_group", "notice", "delay")
+
+NOTICE_TYPES = ("accept_notice", "reject_notice", "increase_notice", "decrease_notice")
+
+LEVEL_LIMIT_REJECT_REASON = "您的 QQ 等级过低，未通过本群自动审核。"
+
+
+def normalize_group_id(value: Any) -> str:
+    group_id = str(value or "").strip()
+    if not group_id or group_id == "默认" or group_id.lower() in {DEFAULT_GROUP_ID, "*"}:
+        return DEFAULT_GROUP_ID
+    return group_id
+
+
+def keywords_from_value(value: Any) -> list[str]:
+    if isinstance(value, str):
+        raw_keywords = value.replace("，", ",").split(",")
+    elif isinstance(value, list):
+        raw_keywords = value
+    else:
+        return []
+    return [str(keyword).strip() for keyword in raw_keywords if str(keyword).strip()]
+
+
+def group_ids_from_rule(item: dict[str, Any]) -> list[str]:
+    raw_group_ids = item.get("group_ids")
+    if raw_group_ids is None:
+        raw_group_ids = item.get("group_id", DEFAULT_GROUP_ID)
+
+    if not isinstance(raw_group_ids, list):
+        raw_group_ids = [raw_group_ids]
+
+    group_ids: list[str] = []
+    for raw_group_id in raw_group_ids:
+        group_id = normalize_group_id(raw_group_id)
+        if group_id not in group_ids:
+            group_ids.append(group_id)
+
+    return group_ids or [DEFAULT_GROUP_ID]
+
+
+def load_message_templates(raw_list: Any, default_text: str) -> dict[str, str]:
+    result: dict[str, str] = {}
+    for item in raw_list if isinstance(raw_list, list) else []:
+        if not isinstance(item, dict):
+            continue
+
+        group_ids = group_ids_from_rule(item)
+        text = str(item.get("text", ""))
+        if text:
+            for group_id in group_ids:
+                result[group_id] = text
+
+    if DEFAULT_GROUP_ID not in result:
+        result[DEFAULT_GROUP_ID] = default_text
+    return result
+
+
+def load_accept_rules(
+    raw_rules: Any,
+) -> tuple[dict[str, dict[str, list[str]]], set[str]]:
+    rules: dict[str, dict[str, list[str]]] = {}
+    configured_groups: set[str] = set()
+
+    for item in raw_rules if isinstance(raw_rules, list) else []:
+        if not isinstance(item, dict):
+            continue
+
+        group_ids = group_ids_from_rule(item)
+        configured_groups.update(group_ids)
+        if not item.get("enabled", True):
+            continue
+
+        category = str(item.get("category", "")).strip()
+        keywords = keywords_from_value(item.get("keywords", []))
+        if not category or not keywords:
+            continue
+
+        for group_id in group_ids:
+            category_rules = rules.setdefault(group_id, {})
+            category_keywords = category_rules.setdefault(category, [])
+            for keyword in keywords:
+                if keyword not in category_keywords:
+                    category_keywords.append(keyword)
+
+    return rules, configured_groups
+
+
+def load_reject_rules(raw_rules: Any) -> tuple[dict[str, list[str]], set[str]]:
+    rules: dict[str, list[str]] = {}
+    configured_groups: set[str] = set()
+
+    for item in raw_rules if isinstance(raw_rules, list) else []:
+        if not isinstance(item, dict):
+            continue
+
+        group_ids = group_ids_from_rule(item)
+        configured_groups.update(group_ids)
+        if not item.get("enabled", True):
+            continue
+
+        keywords = keywords_from_value(item.get("keywords", []))
+        for group_id in group_ids:
+            group_keywords = rules.setdefault(group_id, [])
+            for keyword in keywords:
+                if keyword not in group_keywords:
+                    group_keywords.append(keyword)
+
+    return rules, configured_groups
+
+
+class LevelLimit(NamedTuple):
+    enabled: bool = False
+    min_level: int = 0
+    reject_low_level: bool = False
+    reject_reason: MessageTemplate = compile_template(LEVEL_LIMIT_REJECT_REASON)
+
+
+def load_level_limit(level_limit: Any) -> LevelLimit:
+    if not isinstance(level_limit, dict):
+        level_limit = {}
+    try:
+        min_level = int(level_limit.get("min_level", 0))
+    except (TypeError, ValueError):
+        min_level = 0
+    return LevelLimit(
+        bool(level_limit.get("enabled", False)),
+        min_level,
+        bool(level_limit.get("reject_low_level", False)),
+        compile_template(
+            str(level_limit.get("reject_reason", LEVEL_LIMIT_REJECT_REASON))
+        ),
+    )
+
+
+def load_keyword_table(normalize_config: Any) -> dict[int, int | None] | None:
+    """关键词归一化的转换表，未开启时为 None"""
+    if not isinstance(normalize_config, dict):
+        normalize_config = {}
+    if not normalize_config.get("enabled", False):
+        return None
+    return build_translation_table(
+        bool(normalize_config.get("ignore_spaces", True)),
+        bool(normalize_config.get("traditional", True)),
+    )
+
+
+class NoticeTargets(NamedTuple):
+    # 固定的通知会话
+    sessions: frozenset[str]
+    # 是否同时通知消息源群聊 (origin)
+    origin: bool
+    # 消息源会话 -> 含该会话的通知会话，每个消息源只构造一次
+    with_origin: dict[str, frozenset[str]]
+
+
+class EventSettings(NamedTuple):
+    """事件处理时用到的分群、通知与发送设置，均已解析为可直接查询的形式"""
+
+    whitelist: bool
+    control_list: frozenset[str]
+    disabled_statistics: frozenset[str]
+    notice: dict[str, NoticeTargets]
+    delay: float
+
+    def allows_group(self, group_id: str) -> bool:
+        """检查会话权限"""
+        return (group_id in self.control_list) == self.whitelist
+
+    def statistics_enabled(self, group_id: str) -> bool:
+        return group_id not in self.disabled_statistics
+
+    def notice_sessions(self, type: str, origin: str) -> frozenset[str]:
+        """获取需要通知的会话ID，origin 为消息源的会话"""
+        targets = self.notice.get(type)
+        if targets is None:
+            return frozenset()
+        if not targets.origin or origin in targets.sessions:
+            return targets.sessions
+        sessions = targets.with_origin.get(origin)
+        if sessions is None:
+            sessions = targets.with_origin[origin] = targets.sessions | {origin}
+        return sessions
+
+
+def load_event_settings(config: Any) -> EventSettings:
+    divide_group = config.get("divide_group", {})
+    if not isinstance(divide_group, dict):
+        divide_group = {}
+    control_list = divide_group.get("control_list", [])
+    disabled_statistics = divide_group.get("disabled_statistics", [])
+
+    notice_config = config.get("notice", {})
+    if not isinstance(notice_config, dict):
+        notice_config = {}
+    notice: dict[str, NoticeTargets] = {}
+    for notice_type in NOTICE_TYPES:
+        sessions = notice_config.get(notice_type, [])
+        if not isinstance(sessions, list):
+            sessions = []
+        notice[notice_type] = NoticeTargets(
+            frozenset(str(item) for item in sessions if item != "origin"),
+            "origin" in sessions,
+            {},
+        )
+
+    try:
+        delay = float(config.get("delay", 0.5))
+    except (TypeError, ValueError):
+        delay = 0.5
+
+    return EventSettings(
+        divide_group.get("block_method", "blacklist") == "whitelist",
+        frozenset(
+            str(i) for i in (control_list if isinstance(control_list, list) else [])
+        ),
+        frozenset(
+            str(g)
+            for g in (
+                disabled_statistics if isinstance(disabled_statistics, list) else []
+            )
+        ),
+        notice,
+        max(delay, 0),
+    )
+
+
+def rule_sources(config: Any) -> dict[str, str]:
+    """各配置项序列化后的内容，用于判断哪些部分发生了变化
+
+    message_templates 按模板类型分别记录，只改动欢迎语时不会重建其他模板。
+    """
+    sources = {}
+    for key in RULE_CONFIG_KEYS:
+        value = config.get(key)
+        if key == "message_templates":
+            templates = value if isinstance(value, dict) else {}
+            for template_key in MESSAGE_DEFAULTS:
+                sources[f"{key}.{template_key}"] = _dump(templates.get(template_key))
+        else:
+            sources[key] = _dump(value)
+    return sources
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+class RuleSet:
+    """一次配置对应的全部规则与事件设置，构建后不再修改 (匹配器在首次用到时编译)
+
+    处理事件时先取得当前规则集，之后一直使用它；热重载构建出新规则集后
+    整体替换，进行中的请求不会看到新旧混合的规则。
+    """
+
+    __slots__ = (
+        "sources",
+        "accept_rules",
+        "accept_rule_groups",
+        "reject_rules",
+        "reject_rule_groups",
+        "templates",
+        "level_limit",
+        "keyword_table",
+        "keyword_matchers",
+        "settings",
+    )
+
+    def __init__(self, config: Any, previous: "RuleSet | None" = None):
+        self.sources = rule_sources(config)
+        changed = self.changed_keys(previous)
+
+        def unchanged(key: str) -> bool:
+            return previous is not None and key not in changed
+
+        if unchanged("accept_rules"):
+            self.accept_rules = previous.accept_rules
+            self.accept_rule_groups = previous.accept_rule_groups
+        else:
+            self.accept_rules, self.accept_rule_groups = load_accept_rules(
+                config.get("accept_rules", [])
+            )
+        if unchanged("reject_rules"):
+            self.reject_rules = previous.reject_rules
+            self.reject_rule_groups = previous.reject_rule_groups
+        else:
+            self.reject_rules, self.reject_rule_groups = load_reject_rules(
+                config.get("reject_rules", [])
+            )
+
+        message_templates = config.get("message_templates", {})
+        if not isinstance(message_templates, dict):
+            message_templates = {}
+        # 模板类型 -> {群号: 编译后的模板}
+        self.templates: dict[str, dict[str, MessageTemplate]] = {}
+        for template_key, default_text in MESSAGE_DEFAULTS.items():
+            if unchanged(f"message_templates.{template_key}"):
+                self.templates[template_key] = previous.templates[template_key]
+            else:
+                self.templates[template_key] = {
+                    group_id: compile_template(text)
+                    for group_id, text in load_message_templates(
+                        message_templates.get(template_key, []), default_text
+                    ).items()
+                }
+
+        self.level_limit = (
+            previous.level_limit
+            if unchanged("level_limit")
+            else load_level_limit(config.get("level_limit", {}))
+        )
+        self.keyword_table = (
+            previous.keyword_table
+            if unchanged("keyword_normalize")
+            else load_keyword_table(config.get("keyword_normalize", {}))
+        )
+
+        if previous is not None and not any(
+            key in changed for key in SETTINGS_CONFIG_KEYS
+        ):
+            self.settings = previous.settings
+        else:
+            self.settings = load_event_settings(config)
+
+        # (拒绝规则来源群, 同意规则来源群) -> 编译好的关键词匹配器
+        # 匹配器在首次用到时编译；规则与归一化都未变化的匹配器直接沿用
+        self.keyword_matchers: dict[tuple[str, str], KeywordMatcher] = {}
+        if previous is not None and self.keyword_table is previous.keyword_table:
+            for key, matcher in previous.keyword_matchers.items():
+                reject_group, accept_group = key
+                if self.reject_rules.get(reject_group) == previous.reject_rules.get(
+                    reject_group
+                ) and self.accept_rules.get(accept_group) == previous.accept_rules.get(
+                    accept_group
+                ):
+                    self.keyword_matchers[key] = matcher
+
+    def changed_keys(self, previous: "RuleSet | None") -> list[str]:
+        if previous is None:
+            return list(self.sources)
+        return [
+            key
+            for key, source in self.sources.items()
+            if previous.sources.get(key) != source
+        ]
+
+    def get_accept_rules(self, group_id: str) -> dict[str, list[str]]:
+        group_id = normalize_group_id(group_id)
+        if group_id in self.accept_rule_groups:
+            return self.accept_rules.get(group_id, {})
+        return self.accept_rules.get(DEFAULT_GROUP_ID, {})
+
+    def get_reject_keywords(self, group_id: str) -> list[str]:
+        group_id = normalize_group_id(group_id)
+        if group_id in self.reject_rule_groups:
+            return self.reject_rules.get(group_id, [])
+        return self.reject_rules.get(DEFAULT_GROUP_ID, [])
+
+    def get_keyword_matcher(self, group_id: str) -> KeywordMatcher:
+        """获取群生效规则编译成的匹配器，拒绝词与同意规则分别按群或默认规则生效"""
+        group_id = normalize_group_id(group_id)
+        reject_group = (
+            group_id if group_id in self.reject_rule_groups else DEFAULT_GROUP_ID
+        )
+        accept_group = (
+            group_id if group_id in self.accept_rule_groups else DEFAULT_GROUP_ID
+        )
+        key = (reject_group, accept_group)
+        matcher = self.keyword_matchers.get(key)
+        if matcher is None:
+            matcher = self.keyword_matchers[key] = KeywordMatcher(
+                self.reject_rules.get(reject_group, []),
+                self.accept_rules.get(accept_group, {}),
+                self.keyword_table,
+            )
+        return matcher
+
+    def get_template(self, template_key: str, group_id: str) -> MessageTemplate:
+        """获取群生效的消息模板，没有专属模板时使用默认模板"""
+        templates = self.templates[template_key]
+        template = templates.get(normalize_group_id(group_id))
+        if template is None:
+            template = templates[DEFAULT_GROUP_ID]
+        return template
@@ -0,0 +1,169 @@
+# serializers.py
+import json
+import struct
+import sys
+from array import array
+from typing import Any
+
+from .records import CATEGORIES, REASONS, GroupRecords, to_plain_records
+
+BINARY_MAGIC = b"JMRB"
+BINARY_VERSION = 1
+
+_HEADER = struct.Struct("<4sB")
+_U32 = struct.Struct("<I")
+
+
+class JsonSerializer:
+    """JSON 快照，与旧版 join_records.json 格式一致"""
+
+    name = "json"
+    suffix = ".json"
+
+    def dumps(self, records: dict) -> bytes:
+        return json.dumps(
+            to_plain_records(records), ensure_ascii=False, indent=2
+        ).encode("utf-8")
+
+    def dumps_group(self, group_records: Any) -> bytes:
+        if isinstance(group_records, GroupRecords):
+            group_records = group_records.to_dict()
+        return json.dumps(group_records, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+class BinarySerializer:
+    """紧凑二进制快照
+
+    布局 (小端)：魔数 JMRB + 版本号，分类/理由字符串表，
+    然后逐群写入 群号、人数、\\0 分隔的用户 ID 和三列定长数组
+    (int64 时间戳、uint32 分类 ID、uint32 理由 ID)。
+    读取时直接还原为 GroupRecords 的列，不经过逐条记录的字典。
+    """
+
+    name = "binary"
+    suffix = ".bin"
+
+    @staticmethod
+    def _pack_bytes(parts: list[bytes], data: bytes):
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+
+    @staticmethod
+    def _pack_array(parts: list[bytes], values: array):
+        if sys.byteorder != "little":
+            values = array(values.typecode, values)
+            values.byteswap()
+        parts.append(values.tobytes())
+
+    def _pack_strings(self, parts: list[bytes], values: list[str]):
+        parts.append(_U32.pack(len(values)))
+        self._pack_bytes(parts, "\0".join(values).encode("utf-8"))
+
+    def dumps(self, records: dict) -> bytes:
+        # 驻留表只追加，先取长度再写，保证写入的 ID 都在表内
+        categories = CATEGORIES.values[:]
+        reasons = REASONS.values[:]
+
+        parts: list[bytes] = [_HEADER.pack(BINARY_MAGIC, BINARY_VERSION)]
+        self._pack_strings(parts, categories)
+        self._pack_strings(parts, reasons)
+        parts.append(_U32.pack(len(records)))
+        for group_id, group_records in records.items():
+            if not isinstance(group_records, GroupRecords):
+                group_records = GroupRecords.from_dict(group_records)
+            self._pack_bytes(parts, str(group_id).encode("utf-8"))
+            parts.append(_U32.pack(len(group_records)))
+            self._pack_bytes(parts, "\0".join(group_records.user_ids).encode("utf-8"))
+            self._pack_array(parts, group_records.times)
+            self._pack_array(parts, group_records.category_ids)
+            self._pack_array(parts, group_records.reason_ids)
+        return b"".join(parts)
+
+    def dumps_group(self, group_records: Any) -> bytes:
+        return self.dumps({"": group_records})
+
+    @staticmethod
+    def _remap(ids: array, id_map: list[int]) -> array:
+        # 大多数情况下文件中的字符串表就是当前驻留表的前缀，无需改写
+        if all(file_id == global_id for file_id, global_id in enumerate(id_map)):
+            return ids
+        return array("I", [id_map[value] for value in ids])
+
+    def loads(self, data: bytes) -> dict[str, GroupRecords]:
+        view = memoryview(data)
+        magic, version = _HEADER.unpack_from(view, 0)
+        if magic != BINARY_MAGIC:
+            raise ValueError("不是有效的入群记录二进制快照")
+        if version != BINARY_VERSION:
+            raise ValueError(f"不支持的二进制快照版本: {version}")
+        offset = _HEADER.size
+
+        def read_bytes() -> bytes:
+            nonlocal offset
+            (length,) = _U32.unpack_from(view, offset)
+            offset += _U32.size
+            value = bytes(view[offset : offset + length])
+            offset += length
+            return value
+
+        def read_strings() -> list[str]:
+            nonlocal offset
+            (count,) = _U32.unpack_from(view, offset)
+            offset += _U32.size
+            blob = read_bytes().decode("utf-8")
+            return blob.split("\0") if count else []
+
+        def read_array(typecode: str, count: int) -> array:
+            nonlocal offset
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(view[offset : offset + size])
+            offset += size
+            if sys.byteorder != "little":
+                values.byteswap()
+            return values
+
+        category_map = [CATEGORIES.intern(value) for value in read_strings()]
+        reason_map = [REASONS.intern(value) for value in read_strings()]
+
+        records: dict[str, GroupRecords] = {}
+        (group_count,) = _U32.unpack_from(view, offset)
+        offset += _U32.size
+        for _ in range(group_count):
+            group_id = read_bytes().decode("utf-8")
+            (count,) = _U32.unpack_from(view, offset)
+            offset += _U32.size
+            user_blob = read_bytes().decode("utf-8")
+            user_ids = user_blob.split("\0") if count else []
+            times = read_array("q", count)
+            category_ids = self._remap(read_array("I", count), category_map)
+            reason_ids = self._remap(read_array("I", count), reason_map)
+            records[group_id] = GroupRecords.from_columns(
+                user_ids, times, category_ids, reason_ids
+            )
+        return records
+
+
+SERIALIZERS = {
+    JsonSerializer.name: JsonSerializer(),
+    BinarySerializer.name: BinarySerializer(),
+}
+
+
+def get_serializer(name: str) -> JsonSerializer | BinarySerializer:
+    return SERIALIZERS.get(name, SERIALIZERS[JsonSerializer.name])
+
+
+def loads_records(data: bytes) -> dict:
+    """按文件头自动识别格式并读取全部记录"""
+    if data[: len(BINARY_MAGIC)] == BINARY_MAGIC:
+        return SERIALIZERS[BinarySerializer.name].loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def loads_group(data: bytes) -> Any:
+    """按文件头自动识别格式并读取单个群的记录"""
+    if data[: len(BINARY_MAGIC)] == BINARY_MAGIC:
+        groups = SERIALIZERS[BinarySerializer.name].loads(data)
+        return next(iter(groups.values()), GroupRecords())
+    return json.loads(data.decode("utf-8"))
@@ -0,0 +1,592 @@
+# storage.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from astrbot.api import logger
+
+from .records import GroupRecords, as_group_records
+from .serializers import JsonSerializer, loads_group, loads_records
+
+# 单条记录变更: (操作, 群号, 用户ID, 记录)，操作为 insert / remove
+RecordChange = tuple[str, str, str, dict[str, Any] | None]
+
+
+def _write_bytes_atomic(path: Path, data: bytes):
+    """先写临时文件再替换，避免写入中断损坏原文件"""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with tmp_path.open("wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_json_atomic(path: Path, data: Any):
+    _write_bytes_atomic(
+        path, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    )
+
+
+def load_rollups(path: Path) -> dict:
+    """读取按时间段汇总的入群统计"""
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        # 与入群记录一样交给调用方处理，避免之后用空汇总覆盖文件
+        logger.error(f"加载入群汇总统计失败: {e}")
+        raise
+
+
+def save_rollups(path: Path, rollups: dict):
+    _write_json_atomic(path, rollups)
+
+
+def apply_change(records: dict[str, GroupRecords], change: RecordChange):
+    """把一条变更应用到内存记录上"""
+    op, group_id, user_id, record = change
+    if op == "insert":
+        group_records = records.get(group_id)
+        if group_records is None:
+            group_records = records[group_id] = GroupRecords()
+        group_records.set(user_id, record or {})
+    elif op == "remove":
+        group_records = records.get(group_id)
+        if group_records is not None:
+            group_records.pop(user_id)
+
+
+def summarize_records(group_records: dict) -> dict[str, Any]:
+    """统计单个群的分类人数与入群时间范围"""
+    category_counts: dict[str, int] = {}
+    first_time = ""
+    last_time = ""
+    for record in group_records.values():
+        category = record.get("category", "未知")
+        category_counts[category] = category_counts.get(category, 0) + 1
+        accept_time = record.get("accept_time", "")
+        if accept_time:
+            if not first_time or accept_time < first_time:
+                first_time = accept_time
+            if accept_time > last_time:
+                last_time = accept_time
+    return {
+        "category_counts": category_counts,
+        "first_time": first_time,
+        "last_time": last_time,
+    }
+
+
+class FileRecordStorage:
+    """单文件快照存储：每次变更整体重写快照文件
+
+    快照格式由 serializer 决定 (JSON / 二进制)，读取时按文件头自动识别；
+    fallback_files 为其他格式的快照，用于在格式之间迁移。
+    """
+
+    # 是否支持只加载群索引、按需加载单个群
+    lazy = False
+
+    def __init__(
+        self,
+        records_file: Path,
+        serializer: Any = None,
+        fallback_files: tuple[Path, ...] = (),
+    ):
+        self.records_file = records_file
+        self.serializer = serializer or JsonSerializer()
+        self.fallback_files = fallback_files
+
+    def load(self) -> dict:
+        # 切换过格式时可能同时存在多个快照，以最后写入的为准
+        candidates = [
+            path for path in (self.records_file, *self.fallback_files) if path.exists()
+        ]
+        if not candidates:
+            return {}
+        path = max(candidates, key=lambda candidate: candidate.stat().st_mtime)
+        try:
+            records = loads_records(path.read_bytes())
+        except Exception as e:
+            # 不能返回空记录：调用方会把它当作加载成功，随后的保存会覆盖这个文件
+            logger.error(f"读取 {path.name} 失败: {e}")
+            raise
+        if path != self.records_file:
+            logger.info(
+                f"[JoinManager] 已从 {path.name} 读取入群记录，下次保存时转换格式"
+            )
+        return records
+
+    def load_index(self) -> list[str]:
+        """返回有记录的群号，仅 lazy 为 True 的存储支持"""
+        raise NotImplementedError(
+            f"{type(self).__name__} 只能整体加载，请在 lazy 为 False 时使用 load"
+        )
+
+    def load_group(self, group_id: str) -> Any:
+        """加载单个群的记录，仅 lazy 为 True 的存储支持"""
+        raise NotImplementedError(
+            f"{type(self).__name__} 只能整体加载，请在 lazy 为 False 时使用 load"
+        )
+
+    def has_unsaved(self, group_id: str) -> bool:
+        """该群是否还有未成功写入的数据，有则不能从内存中淘汰"""
+        return False
+
+    def save(self, records: dict):
+        _write_bytes_atomic(self.records_file, self.serializer.dumps(records))
+
+    def apply(self, records: dict, changes: list[RecordChange]):
+        self.save(records)
+
+    def snapshot(self, records: dict, changes: list[RecordChange]) -> dict:
+        """拍摄 apply 所需的记录快照，供后台线程写入时使用"""
+        return {
+            group_id: group_records.copy()
+            for group_id, group_records in records.items()
+        }
+
+    def group_summary(self, group_id: str) -> dict[str, Any] | None:
+        """由存储直接给出群统计，不支持时返回 None 由调用方基于内存计算"""
+        return None
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def begin_compaction(self):
+        pass
+
+    def compact(self, snapshot: dict):
+        pass
+
+    def close(self):
+        pass
+
+
+class JournalRecordStorage(FileRecordStorage):
+    """快照 + 追加日志存储
+
+    变更以 JSON Lines 追加到日志文件，加载时先读快照再重放日志。
+    日志超过阈值后轮转为 .old，由后台把当前记录写成新快照后删除旧日志；
+    重放是幂等的，合并中途中断也不会丢数据。
+    """
+
+    def __init__(
+        self,
+        records_file: Path,
+        journal_file: Path,
+        compact_bytes: int,
+        serializer: Any = None,
+        fallback_files: tuple[Path, ...] = (),
+    ):
+        super().__init__(records_file, serializer, fallback_files)
+        self.journal_file = journal_file
+        self.rotated_journal_file = journal_file.with_name(f"{journal_file.name}.old")
+        self.compact_bytes = max(compact_bytes, 1)
+        self.journal_size = 0
+
+    def load(self) -> dict:
+        # 快照可能是 JSON 字典也可能是二进制读出的 GroupRecords，统一后再重放
+        records = {
+            str(group_id): as_group_records(group_records)
+            for group_id, group_records in super().load().items()
+        }
+        replayed = 0
+        for journal_path in (self.rotated_journal_file, self.journal_file):
+            replayed += self._replay(journal_path, records)
+        if replayed:
+            logger.info(f"[JoinManager] 已重放 {replayed} 条入群记录日志")
+        try:
+            self.journal_size = self.journal_file.stat().st_size
+        except FileNotFoundError:
+            self.journal_size = 0
+        if self.journal_size:
+            # 补齐被截断的尾行，避免后续追加的记录与其粘连
+            with self.journal_file.open("rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+                    self.journal_size += 1
+        return records
+
+    @staticmethod
+    def _replay(journal_path: Path, records: dict[str, GroupRecords]) -> int:
+        if not journal_path.exists():
+            return 0
+
+        count = 0
+        with journal_path.open("r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    change = (
+                        entry["op"],
+                        str(entry["group_id"]),
+                        str(entry["user_id"]),
+                        entry.get("record"),
+                    )
+                except (ValueError, KeyError, TypeError) as e:
+                    # 进程中断时最后一行可能只写了一半
+                    logger.warning(
+                        f"[JoinManager] 跳过损坏的日志行: {journal_path.name}:{line_no} | {e}"
+                    )
+                    continue
+                apply_change(records, change)
+                count += 1
+        return count
+
+    def apply(self, records: dict, changes: list[RecordChange]):
+        if not changes:
+            return
+        payload = "".join(
+            json.dumps(
+                {
+                    "op": op,
+                    "group_id": group_id,
+                    "user_id": user_id,
+                    "record": record,
+                },
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+            + "\n"
+            for op, group_id, user_id, record in changes
+        ).encode("utf-8")
+        with self.journal_file.open("ab") as f:
+            f.write(payload)
+            f.flush()
+        self.journal_size += len(payload)
+
+    def snapshot(self, records: dict, changes: list[RecordChange]) -> dict:
+        # 日志只追加变更本身，不需要拷贝记录
+        return {}
+
+    def save(self, records: dict):
+        super().save(records)
+        self.rotated_journal_file.unlink(missing_ok=True)
+        self.journal_file.unlink(missing_ok=True)
+        self.journal_size = 0
+
+    def needs_compaction(self) -> bool:
+        return (
+            self.journal_size >= self.compact_bytes
+            and not self.rotated_journal_file.exists()
+        )
+
+    def begin_compaction(self):
+        """轮转日志，需与拍摄快照在同一同步片段内调用"""
+        if self.journal_file.exists():
+            os.replace(self.journal_file, self.rotated_journal_file)
+        self.journal_size = 0
+
+    def compact(self, snapshot: dict):
+        super().save(snapshot)
+        self.rotated_journal_file.unlink(missing_ok=True)
+
+
+class ShardedRecordStorage(FileRecordStorage):
+    """按群分片的 JSON 存储
+
+    每个群一个文件 records/<group_id>.json，records/index.json 记录群号到
+    分片文件的映射；变更只重写涉及的群，首次启用时自动拆分旧的 JSON 记录。
+    """
+
+    lazy = True
+
+    def __init__(self, shard_dir: Path, records_file: Path, serializer: Any = None):
+        super().__init__(records_file, serializer)
+        self.shard_dir = shard_dir
+        self.manifest_file = shard_dir / "index.json"
+        self.shard_files: dict[str, str] = {}
+        # 写入失败、需要在下次保存时重写的群
+        self.dirty_groups: set[str] = set()
+
+    def _shard_name(self, group_id: str) -> str:
+        suffix = self.serializer.suffix
+        safe_name = "".join(
+            char for char in group_id if char.isalnum() or char in "-_"
+        )
+        if safe_name and safe_name == group_id:
+            return f"{safe_name}{suffix}"
+        digest = hashlib.sha1(group_id.encode("utf-8")).hexdigest()[:8]
+        return f"{safe_name or 'group'}_{digest}{suffix}"
+
+    def _write_manifest(self):
+        _write_json_atomic(
+            self.manifest_file, {"version": 1, "groups": self.shard_files}
+        )
+
+    def _write_shard(self, group_id: str, group_records: dict):
+        # 文件名随当前快照格式变化，切换格式后重写的群改用新的后缀
+        shard_name = self._shard_name(group_id)
+        previous_name = self.shard_files.get(group_id)
+        _write_bytes_atomic(
+            self.shard_dir / shard_name, self.serializer.dumps_group(group_records)
+        )
+        if previous_name == shard_name:
+            return
+        self.shard_files[group_id] = shard_name
+        self._write_manifest()
+        # 索引已指向新分片后再删除旧格式的文件
+        if previous_name is not None:
+            (self.shard_dir / previous_name).unlink(missing_ok=True)
+
+    def _read_shard(self, group_id: str, shard_name: str) -> Any:
+        shard_path = self.shard_dir / shard_name
+        if not shard_path.exists():
+            return {}
+        try:
+            return loads_group(shard_path.read_bytes())
+        except Exception as e:
+            logger.error(f"加载入群记录分片失败: {group_id} | {e}")
+            return {}
+
+    def _import_json(self):
+        """一次性把旧版 join_records.json 拆分为分片"""
+        records = super().load()
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        for group_id, group_records in records.items():
+            shard_name = self._shard_name(str(group_id))
+            _write_bytes_atomic(
+                self.shard_dir / shard_name,
+                self.serializer.dumps_group(group_records),
+            )
+            self.shard_files[str(group_id)] = shard_name
+        self._write_manifest()
+        if records:
+            logger.info(
+                f"[JoinManager] 已将 {self.records_file.name} 拆分为 {len(records)} 个群分片"
+            )
+
+    def load_index(self) -> list[str]:
+        if not self.manifest_file.exists():
+            self._import_json()
+        else:
+            with self.manifest_file.open("r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.shard_files = {
+                str(group_id): str(shard_name)
+                for group_id, shard_name in manifest.get("groups", {}).items()
+            }
+        return list(self.shard_files)
+
+    def load_group(self, group_id: str) -> Any:
+        shard_name = self.shard_files.get(group_id)
+        if shard_name is None:
+            return {}
+        return self._read_shard(group_id, shard_name)
+
+    def has_unsaved(self, group_id: str) -> bool:
+        return group_id in self.dirty_groups
+
+    def load(self) -> dict:
+        return {group_id: self.load_group(group_id) for group_id in self.load_index()}
+
+    def apply(self, records: dict, changes: list[RecordChange]):
+        changed_groups = {group_id for _, group_id, _, _ in changes}
+        changed_groups.update(self.dirty_groups)
+        self.dirty_groups.clear()
+        for group_id in changed_groups:
+            if group_id not in records:
+                continue
+            try:
+                self._write_shard(group_id, records[group_id])
+            except Exception:
+                self.dirty_groups.add(group_id)
+                raise
+
+    def snapshot(self, records: dict, changes: list[RecordChange]) -> dict:
+        # 只复制发生变更的群
+        changed_groups = {group_id for _, group_id, _, _ in changes}
+        changed_groups.update(self.dirty_groups)
+        return {
+            group_id: records[group_id].copy()
+            for group_id in changed_groups
+            if group_id in records
+        }
+
+    def save(self, records: dict):
+        # 已写入的分片不再重写，只补写新群和之前写入失败的群
+        new_groups = records.keys() - self.shard_files.keys()
+        pending_groups = self.dirty_groups | new_groups
+        self.dirty_groups.clear()
+        for group_id in pending_groups:
+            if group_id in records:
+                self._write_shard(group_id, records[group_id])
+
+
+class SqliteRecordStorage(FileRecordStorage):
+    """SQLite 存储 (WAL 模式)
+
+    每次变更只做一次带索引的插入或删除；首次启动时自动导入旧的 JSON 记录。
+    """
+
+    lazy = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS records (
+            group_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            accept_time TEXT NOT NULL DEFAULT '',
+            accept_reason TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (group_id, user_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_records_group_category
+            ON records (group_id, category);
+        CREATE INDEX IF NOT EXISTS idx_records_accept_time
+            ON records (accept_time);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_file: Path, records_file: Path):
+        super().__init__(records_file)
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_file), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _row_from_record(
+        group_id: str, user_id: str, record: dict[str, Any]
+    ) -> tuple[str, str, str, str, str]:
+        return (
+            group_id,
+            user_id,
+            str(record.get("accept_time", "")),
+            str(record.get("accept_reason", "")),
+            str(record.get("category", "")),
+        )
+
+    def _import_json(self):
+        """一次性导入旧版 join_records.json"""
+        with self.lock:
+            imported = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_imported'"
+            ).fetchone()
+        if imported or not self.records_file.exists():
+            return
+
+        records = super().load()
+        rows = [
+            self._row_from_record(str(group_id), str(user_id), record)
+            for group_id, group_records in records.items()
+            for user_id, record in group_records.items()
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)",
+                (str(self.records_file),),
+            )
+        logger.info(
+            f"[JoinManager] 已从 {self.records_file.name} 导入 {len(rows)} 条入群记录"
+        )
+
+    def load(self) -> dict:
+        records: dict[str, dict[str, dict[str, str]]] = {}
+        self._import_json()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT group_id, user_id, accept_time, accept_reason, category"
+                " FROM records"
+            ).fetchall()
+        for group_id, user_id, accept_time, accept_reason, category in rows:
+            records.setdefault(group_id, {})[user_id] = {
+                "accept_time": accept_time,
+                "accept_reason": accept_reason,
+                "category": category,
+            }
+        return records
+
+    def load_index(self) -> list[str]:
+        self._import_json()
+        with self.lock:
+            rows = self.conn.execute("SELECT DISTINCT group_id FROM records").fetchall()
+        return [row[0] for row in rows]
+
+    def load_group(self, group_id: str) -> dict:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT user_id, accept_time, accept_reason, category"
+                " FROM records WHERE group_id = ?",
+                (group_id,),
+            ).fetchall()
+        return {
+            user_id: {
+                "accept_time": accept_time,
+                "accept_reason": accept_reason,
+                "category": category,
+            }
+            for user_id, accept_time, accept_reason, category in rows
+        }
+
+    def apply(self, records: dict, changes: list[RecordChange]):
+        inserts = []
+        removes = []
+        for op, group_id, user_id, record in changes:
+            if op == "insert" and record is not None:
+                inserts.append(self._row_from_record(group_id, user_id, record))
+            elif op == "remove":
+                removes.append((group_id, user_id))
+
+        with self.lock, self.conn:
+            if inserts:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)", inserts
+                )
+            if removes:
+                self.conn.executemany(
+                    "DELETE FROM records WHERE group_id = ? AND user_id = ?", removes
+                )
+
+    def snapshot(self, records: dict, changes: list[RecordChange]) -> dict:
+        return {}
+
+    def save(self, records: dict):
+        # 变更已逐条落库，这里只把 WAL 合并回主库
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def group_summary(self, group_id: str) -> dict[str, Any] | None:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT category, COUNT(*), MIN(NULLIF(accept_time, '')),"
+                " MAX(NULLIF(accept_time, ''))"
+                " FROM records WHERE group_id = ? GROUP BY category",
+                (group_id,),
+            ).fetchall()
+
+        category_counts: dict[str, int] = {}
+        first_time = ""
+        last_time = ""
+        for category, count, min_time, max_time in rows:
+            category_counts[category or "未知"] = count
+            if min_time and (not first_time or min_time < first_time):
+                first_time = min_time
+            if max_time and max_time > last_time:
+                last_time = max_time
+        return {
+            "category_counts": category_counts,
+            "first_time": first_time,
+            "last_time": last_time,
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
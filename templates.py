@@ -0,0 +1,116 @@
+# templates.py
+# 消息模板预编译为文本片段与占位符，渲染时只获取模板实际用到的数据
+import asyncio
+import re
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+
+# 占位符 -> 数据来源，None 表示由调用方直接提供
+PLACEHOLDER_SOURCES: dict[str, str | None] = {
+    "group_id": None,
+    "user_id": None,
+    "key": None,
+    "category": None,
+    "comment": None,
+    "min_level": None,
+    "level_reason": None,
+    # 群名称有缓存，通常不需要调用接口
+    "group_name": "group_name",
+    # 群人数随时变化，每次通过 get_group_info 获取
+    "member_count": "group_info",
+    "max_member_count": "group_info",
+    # 通过 get_stranger_info 获取
+    "user_name": "stranger_info",
+    "user_level": "stranger_info",
+}
+
+_PLACEHOLDER_PATTERN = re.compile(
+    "%(" + "|".join(map(re.escape, PLACEHOLDER_SOURCES)) + ")%"
+)
+
+
+class MessageTemplate:
+    """编译后的消息模板
+
+    segments 中偶数位为原文，奇数位为占位符名称；未知的 %xxx% 按原文保留。
+    """
+
+    __slots__ = ("text", "segments", "placeholders", "sources")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.segments: tuple[str, ...] = tuple(_PLACEHOLDER_PATTERN.split(text))
+        self.placeholders = frozenset(self.segments[1::2])
+        self.sources = frozenset(
+            source
+            for name in self.placeholders
+            if (source := PLACEHOLDER_SOURCES[name]) is not None
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    def render(self, values: dict[str, str]) -> str:
+        """没有提供数据的占位符按原文保留，与逐个 str.replace 的结果一致"""
+        if len(self.segments) == 1:
+            return self.text
+        parts = list(self.segments)
+        for index in range(1, len(parts), 2):
+            name = parts[index]
+            parts[index] = values.get(name, f"%{name}%")
+        return "".join(parts)
+
+
+@lru_cache(maxsize=256)
+def compile_template(text: str) -> MessageTemplate:
+    return MessageTemplate(text)
+
+
+class TemplateData:
+    """一次事件的占位符数据
+
+    远程数据按来源登记加载函数，只有模板用到该来源的占位符时才调用，
+    同一事件内每个来源最多加载一次。
+    """
+
+    __slots__ = ("values", "loaders", "loaded")
+
+    def __init__(
+        self,
+        values: dict[str, str],
+        loaders: dict[str, Callable[[], Awaitable[dict[str, str]]]],
+    ):
+        self.values = values
+        self.loaders = loaders
+        self.loaded: set[str] = set()
+
+    def provide(self, source: str, values: dict[str, str]):
+        """登记已经取得的某个来源的数据，之后不再调用其加载函数"""
+        self.values.update(values)
+        self.loaded.add(source)
+
+    async def render(
+        self, template: MessageTemplate, extra: dict[str, str] | None = None
+    ) -> str:
+        """渲染模板，extra 为只对本次渲染生效的占位符"""
+        values = {**self.values, **extra} if extra else self.values
+        # extra 已经提供了某个来源的全部占位符时不需要加载
+        sources = [
+            source
+            for source in template.sources
+            if source not in self.loaded
+            and source in self.loaders
+            and any(
+                PLACEHOLDER_SOURCES[name] == source and name not in values
+                for name in template.placeholders
+            )
+        ]
+        if sources:
+            # 多个来源的接口并发调用
+            results = await asyncio.gather(
+                *(self.loaders[source]() for source in sources)
+            )
+            for source, result in zip(sources, results):
+                self.provide(source, result)
+            values = {**self.values, **extra} if extra else self.values
+        return template.render(values)
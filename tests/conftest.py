@@ -0,0 +1,6 @@
+"""测试与基准测试共用插件加载方式，无需安装 AstrBot"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
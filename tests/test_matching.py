@@ -0,0 +1,24 @@
+import pytest
+from _bootstrap import import_plugin_module
+from _fixtures import build_comments, build_keyword_rules
+from bench_keywords import match_accept_rule, match_reject_keyword
+
+matching = import_plugin_module("matching")
+
+
+@pytest.mark.parametrize("keyword_count", [5, 200])
+def test_compiled_matcher_agrees_with_loop(keyword_count):
+    reject_keywords, accept_rules = build_keyword_rules(keyword_count)
+    all_keywords = reject_keywords + [
+        keyword for keywords in accept_rules.values() for keyword in keywords
+    ]
+    matcher = matching.KeywordMatcher(reject_keywords, accept_rules)
+
+    for comment in build_comments(500, all_keywords):
+        comment_lower = comment.lower()
+        result = matcher.match(comment)
+        rejected = match_reject_keyword(reject_keywords, comment_lower)
+        assert result.reject_keyword == rejected
+        # 命中拒绝词时不再匹配同意规则
+        accepted = None if rejected else match_accept_rule(accept_rules, comment_lower)
+        assert (result.category, result.accept_keyword) == (accepted or (None, None))
@@ -0,0 +1,30 @@
+from _bootstrap import import_plugin_module
+
+rules = import_plugin_module("rules")
+
+
+def test_notice_sessions_are_built_once_per_origin():
+    settings = rules.load_event_settings(
+        {
+            "notice": {
+                "accept_notice": ["origin", "aiocqhttp:GroupMessage:1"],
+                "reject_notice": ["aiocqhttp:GroupMessage:1"],
+            }
+        }
+    )
+    origin = "aiocqhttp:GroupMessage:2"
+
+    sessions = settings.notice_sessions("accept_notice", origin)
+    assert sessions == {origin, "aiocqhttp:GroupMessage:1"}
+    assert settings.notice_sessions("accept_notice", origin) is sessions
+    # 消息源已在通知会话中、或不通知消息源时直接返回预先解析的集合
+    targets = settings.notice["accept_notice"]
+    assert (
+        settings.notice_sessions("accept_notice", "aiocqhttp:GroupMessage:1")
+        is targets.sessions
+    )
+    assert (
+        settings.notice_sessions("reject_notice", origin)
+        is settings.notice["reject_notice"].sessions
+    )
+    assert settings.notice_sessions("decrease_notice", origin) == frozenset()
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from _bootstrap import import_plugin_module
+
+records_module = import_plugin_module("records")
+serializers = import_plugin_module("serializers")
+storage_module = import_plugin_module("storage")
+
+
+def record(category: str) -> dict:
+    return {
+        "accept_time": "2026-01-01 12:00:00",
+        "accept_reason": f"匹配关键词: {category}",
+        "category": category,
+    }
+
+
+def create_journal_storage(data_dir):
+    return storage_module.JournalRecordStorage(
+        data_dir / "join_records.bin",
+        data_dir / "join_records.journal",
+        1024 * 1024,
+        serializers.get_serializer("binary"),
+    )
+
+
+def test_journal_replays_over_binary_snapshot_after_crash(tmp_path):
+    storage = create_journal_storage(tmp_path)
+    records = {
+        str(group_id): records_module.as_group_records(group_records)
+        for group_id, group_records in storage.load().items()
+    }
+    group = records.setdefault("100", records_module.GroupRecords())
+    group.set("1", record("B站"))
+    group.set("2", record("GitHub"))
+    storage.save(records)
+
+    # 快照之后的变更只写入日志，随后进程异常退出，不再保存快照
+    storage.apply(
+        records,
+        [
+            ("insert", "100", "3", record("抖音")),
+            ("insert", "200", "4", record("B站")),
+            ("remove", "100", "2", None),
+            ("remove", "300", "5", None),
+        ],
+    )
+    assert (tmp_path / "join_records.journal").stat().st_size > 0
+
+    loaded = create_journal_storage(tmp_path).load()
+    assert set(loaded) == {"100", "200"}
+    assert sorted(loaded["100"]) == ["1", "3"]
+    assert loaded["100"].get("3")["category"] == "抖音"
+    assert list(loaded["200"]) == ["4"]
+    assert loaded["100"].stats.summary()["category_counts"] == {"B站": 1, "抖音": 1}
+
+
+def test_single_file_storage_does_not_load_groups_lazily(tmp_path):
+    storage = storage_module.FileRecordStorage(tmp_path / "join_records.json")
+    storage.save({"100": {"1": record("B站")}})
+
+    # 单文件存储只能整体加载，逐个群加载会反复读取整个快照
+    assert not storage.lazy
+    with pytest.raises(NotImplementedError):
+        storage.load_index()
+    with pytest.raises(NotImplementedError):
+        storage.load_group("100")
+
+
+def load_then_save(storage) -> bool:
+    """与插件加载记录的流程一致：加载失败时不写入任何数据"""
+    try:
+        records = storage.load()
+    except Exception:
+        return False
+    storage.save(records)
+    return True
+
+
+@pytest.mark.parametrize("serializer_name", ["json", "binary"])
+def test_corrupt_snapshot_is_not_overwritten(tmp_path, serializer_name):
+    serializer = serializers.get_serializer(serializer_name)
+    records_file = tmp_path / f"join_records{serializer.suffix}"
+    storage = storage_module.JournalRecordStorage(
+        records_file, tmp_path / "join_records.journal", 1024 * 1024, serializer
+    )
+    storage.save({"100": {"1": record("B站"), "2": record("GitHub")}})
+    # 模拟写入中断留下的截断文件
+    truncated = records_file.read_bytes()[:-20]
+    records_file.write_bytes(truncated)
+
+    with pytest.raises(Exception):
+        storage.load()
+    assert not load_then_save(
+        storage_module.FileRecordStorage(records_file, serializer)
+    )
+    assert records_file.read_bytes() == truncated
+
+
+def test_sharded_storage_renames_shards_after_format_switch(tmp_path):
+    shard_dir = tmp_path / "records"
+    records_file = tmp_path / "join_records.json"
+    records = {"100": {"1": record("B站")}, "200": {"2": record("GitHub")}}
+    json_storage = storage_module.ShardedRecordStorage(shard_dir, records_file)
+    json_storage.load_index()
+    json_storage.save(records)
+
+    storage = storage_module.ShardedRecordStorage(
+        shard_dir, records_file, serializers.get_serializer("binary")
+    )
+    assert sorted(storage.load_index()) == ["100", "200"]
+    loaded = {"100": records_module.as_group_records(storage.load_group("100"))}
+    loaded["100"].set("3", record("抖音"))
+    storage.apply(loaded, [("insert", "100", "3", record("抖音"))])
+
+    manifest = json.loads((shard_dir / "index.json").read_text(encoding="utf-8"))
+    assert manifest["groups"] == {"100": "100.bin", "200": "200.json"}
+    assert not (shard_dir / "100.json").exists()
+    assert (shard_dir / "100.bin").read_bytes()[:4] != b"{"
+
+    reloaded = storage_module.ShardedRecordStorage(shard_dir, records_file)
+    reloaded.load_index()
+    assert sorted(reloaded.load_group("100")) == ["1", "3"]
+    assert list(reloaded.load_group("200")) == ["2"]
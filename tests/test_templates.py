@@ -0,0 +1,42 @@
+import asyncio
+
+from _bootstrap import import_plugin_module
+
+templates = import_plugin_module("templates")
+
+
+def test_placeholders_without_data_stay_literal():
+    template = templates.compile_template("欢迎 %user_id% 加入，关键词: %key% %unknown%")
+
+    assert template.render({"user_id": "10001"}) == (
+        "欢迎 10001 加入，关键词: %key% %unknown%"
+    )
+    assert template.render({"user_id": "10001", "key": "B站"}) == (
+        "欢迎 10001 加入，关键词: B站 %unknown%"
+    )
+
+
+def test_template_data_loads_only_used_sources():
+    calls = []
+
+    def loader(source: str, values: dict[str, str]):
+        async def load() -> dict[str, str]:
+            calls.append(source)
+            return values
+
+        return load
+
+    data = templates.TemplateData(
+        {"group_id": "100", "user_id": "10001"},
+        {
+            "group_name": loader("group_name", {"group_name": "测试群"}),
+            "stranger_info": loader(
+                "stranger_info", {"user_name": "小明", "user_level": "12"}
+            ),
+        },
+    )
+    template = templates.compile_template("%user_name% 加入了 %group_name%")
+
+    assert asyncio.run(data.render(template)) == "小明 加入了 测试群"
+    assert asyncio.run(data.render(template)) == "小明 加入了 测试群"
+    assert sorted(calls) == ["group_name", "stranger_info"]